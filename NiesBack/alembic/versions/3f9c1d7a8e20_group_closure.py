@@ -0,0 +1,51 @@
+"""tabela group_closure (ancestral, descendente, profundidade) + backfill
+
+Revision ID: 3f9c1d7a8e20
+Revises: e5a7c3b91d48
+Create Date: 2026-10-18 14:05:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d7a8e20'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c3b91d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    closure = op.create_table('group_closure',
+    sa.Column('ancestor_id', sa.String(length=64), nullable=False),
+    sa.Column('descendant_id', sa.String(length=64), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_group_closure_descendant_depth', 'group_closure', ['descendant_id', 'depth'], unique=False)
+    op.create_index(op.f('ix_reports_group_id'), 'reports', ['group_id'], unique=False)
+
+    # backfill: sobe de cada grupo até a raiz (protege contra ciclos)
+    parent_by_id = dict(op.get_bind().execute(sa.text("SELECT id, parent_id FROM groups")).all())
+    rows = []
+    for gid in parent_by_id:
+        cur, depth, seen = gid, 0, set()
+        while cur is not None and cur in parent_by_id and cur not in seen:
+            rows.append({'ancestor_id': cur, 'descendant_id': gid, 'depth': depth})
+            seen.add(cur)
+            cur, depth = parent_by_id[cur], depth + 1
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reports_group_id'), table_name='reports')
+    op.drop_index('ix_group_closure_descendant_depth', table_name='group_closure')
+    op.drop_table('group_closure')
@@ -0,0 +1,27 @@
+"""índice (sort_order, name, id) em reports p/ a paginação keyset do catálogo
+
+Revision ID: 8b2e4f6a1c93
+Revises: 3f9c1d7a8e20
+Create Date: 2026-10-18 16:42:10.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4f6a1c93'
+down_revision: Union[str, Sequence[str], None] = '3f9c1d7a8e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reports_catalog_order', 'reports', ['sort_order', 'name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reports_catalog_order', table_name='reports')
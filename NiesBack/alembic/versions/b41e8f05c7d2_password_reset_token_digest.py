@@ -0,0 +1,35 @@
+"""password_resets.token_digest (HMAC) e token_hash opcional
+
+Revision ID: b41e8f05c7d2
+Revises: 7c2d9e4a1f36
+Create Date: 2026-10-18 10:03:11.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e8f05c7d2'
+down_revision: Union[str, Sequence[str], None] = '7c2d9e4a1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('password_resets', sa.Column('token_digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_password_resets_token_digest'), 'password_resets', ['token_digest'], unique=True)
+    # resets antigos (bcrypt) continuam válidos: são migrados p/ digest no primeiro uso
+    op.alter_column('password_resets', 'token_hash', existing_type=sa.String(length=255), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # resets já no formato novo não têm como voltar p/ bcrypt: descarta os pendentes
+    op.execute("DELETE FROM password_resets WHERE token_hash IS NULL")
+    op.alter_column('password_resets', 'token_hash', existing_type=sa.String(length=255), nullable=False)
+    op.drop_index(op.f('ix_password_resets_token_digest'), table_name='password_resets')
+    op.drop_column('password_resets', 'token_digest')
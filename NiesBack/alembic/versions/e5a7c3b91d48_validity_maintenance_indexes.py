@@ -0,0 +1,32 @@
+"""índices p/ a manutenção de vigência de usuários e limpeza de password_resets
+
+Revision ID: e5a7c3b91d48
+Revises: b41e8f05c7d2
+Create Date: 2026-10-18 11:20:52.771930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c3b91d48'
+down_revision: Union[str, Sequence[str], None] = 'b41e8f05c7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_status_valid_from', 'users', ['status', 'valid_from'], unique=False)
+    op.create_index('ix_users_status_valid_to', 'users', ['status', 'valid_to'], unique=False)
+    op.create_index(op.f('ix_password_resets_expires_at'), 'password_resets', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_password_resets_expires_at'), table_name='password_resets')
+    op.drop_index('ix_users_status_valid_to', table_name='users')
+    op.drop_index('ix_users_status_valid_from', table_name='users')
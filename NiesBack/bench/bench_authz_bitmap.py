@@ -0,0 +1,129 @@
+"""
+Benchmark do índice de autorização em bitmap (services/authz.py) contra a versão
+com conjuntos (frozenset de Report.id por grupo, união por usuário).
+
+    python -m bench.bench_authz_bitmap --reports 50000 --groups 5000
+
+Catálogo sintético, sem banco: cada grupo de usuários libera --perms-per-group
+relatórios, cada usuário está em --groups-per-user grupos. Mede a montagem do
+índice e o que cada request paga: união dos grupos do usuário (sem memo),
+checagem de 1 relatório, grupos do catálogo visíveis (menu) e ids de 1 grupo.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from services.authz import allowed_bits, build_index
+
+
+class _User:
+    __slots__ = ("id", "is_admin", "group_ids")
+
+    def __init__(self, group_ids: frozenset[int]):
+        self.id = 0
+        self.is_admin = False
+        self.group_ids = group_ids
+
+
+def _timeit(fn, iterations: int) -> list[float]:
+    out = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _report(name: str, ms: list[float]) -> float:
+    ms = sorted(ms)
+    mean = statistics.fmean(ms)
+    print(f"  {name:<22} mean={mean:9.4f} ms  p50={ms[len(ms) // 2]:9.4f} ms  max={ms[-1]:9.4f} ms")
+    return mean
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--reports", type=int, default=50_000)
+    ap.add_argument("--groups", type=int, default=5_000, help="grupos de usuários (UserGroup)")
+    ap.add_argument("--catalog-groups", type=int, default=500, help="grupos do catálogo (Group)")
+    ap.add_argument("--perms-per-group", type=int, default=200)
+    ap.add_argument("--groups-per-user", type=int, default=8)
+    ap.add_argument("--public-ratio", type=float, default=0.2)
+    ap.add_argument("--iterations", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    report_ids = [f"rep-{i:06d}" for i in range(args.reports)]
+    catalog = [f"grp-{i:04d}" for i in range(args.catalog_groups)]
+    reports = [(rid, rnd.choice(catalog), rnd.random() < args.public_ratio) for rid in report_ids]
+    permissions = [
+        (g, rid)
+        for g in range(args.groups)
+        for rid in rnd.sample(report_ids, args.perms_per_group)
+    ]
+    users = [
+        _User(frozenset(rnd.sample(range(args.groups), args.groups_per_user)))
+        for _ in range(args.iterations)
+    ]
+    print(f"{args.reports:,} relatórios × {args.groups:,} grupos, {len(permissions):,} permissões, "
+          f"{args.groups_per_user} grupos/usuário")
+
+    # ---- bitmap ----
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    idx = build_index(reports, permissions)
+    build_ms = (time.perf_counter() - t0) * 1000
+    bitmap_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"bitmap: índice em {build_ms:,.0f} ms, {bitmap_mem / 2**20:,.1f} MiB")
+
+    it = iter(users * 10)
+    probe = rnd.sample(report_ids, 1)[0]
+    target = catalog[0]
+
+    def bitmap_request():
+        u = next(it)
+        idx._unions.clear()  # mede a união de verdade, sem o memo
+        bits = allowed_bits(idx, u)
+        idx.has(bits, probe)
+        idx.catalog_groups(bits)
+        idx.decode(bits & idx.by_catalog_group[target])
+
+    bitmap_ms = _report("request (bitmap)", _timeit(bitmap_request, args.iterations))
+    _report("decode todos os ids", _timeit(lambda: idx.decode(allowed_bits(idx, users[0])), 20))
+
+    # ---- conjuntos ----
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    public = frozenset(rid for rid, _, p in reports if p)
+    report_group = {rid: g for rid, g, _ in reports}
+    tmp: dict[int, set[str]] = {}
+    for g, rid in permissions:
+        tmp.setdefault(g, set()).add(rid)
+    by_group = {g: frozenset(s) for g, s in tmp.items()}
+    by_catalog: dict[str, set[str]] = {}
+    for rid, g in report_group.items():
+        by_catalog.setdefault(g, set()).add(rid)
+    set_build_ms = (time.perf_counter() - t0) * 1000
+    set_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"sets:   índice em {set_build_ms:,.0f} ms, {set_mem / 2**20:,.1f} MiB")
+
+    it = iter(users * 10)
+
+    def set_request():
+        u = next(it)
+        allowed = public.union(*(by_group.get(g, ()) for g in u.group_ids))
+        probe in allowed
+        {report_group[rid] for rid in allowed}
+        allowed & by_catalog[target]
+
+    set_ms = _report("request (sets)", _timeit(set_request, args.iterations))
+    print(f"speedup por request: {set_ms / bitmap_ms:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
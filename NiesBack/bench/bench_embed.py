@@ -0,0 +1,108 @@
+"""
+Benchmark do caminho de embed: dispara /api/powerbi/embed-info com concorrência fixa
+e mostra vazão e latências p50/p95/p99.
+
+Com a API apontando para o stand-in (ver bench/pbi_standin.py):
+    python -m bench.bench_embed --base-url http://127.0.0.1:8000 \\
+        --report-id meu-painel --concurrency 20 --requests 2000 \\
+        --standin-url http://127.0.0.1:9000
+
+Vários --report-id alternam entre relatórios; --username/--roles exercitam o RLS.
+Com --standin-url, também mostra quantas chamadas chegaram ao "Power BI" por request.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+
+def _pct(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def _worker(client, urls, remaining, latencies, statuses):
+    while True:
+        try:
+            next(remaining)
+        except StopIteration:
+            return
+        url = next(urls)
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(url)
+            statuses[r.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(args) -> None:
+    params = ""
+    if args.username:
+        params += f"&username={args.username}"
+        if args.roles:
+            params += f"&roles={args.roles}"
+    urls = itertools.cycle(
+        f"{args.base_url.rstrip('/')}{args.path}?reportId={rid}{params}" for rid in args.report_id
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if args.standin_url:
+            await client.delete(f"{args.standin_url.rstrip('/')}/_stats")
+
+        # aquecimento: popula os caches antes da medição (como em produção no meio do dia)
+        for _ in range(args.warmup):
+            await client.get(next(urls))
+
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        remaining = iter(range(args.requests))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, urls, remaining, latencies, statuses) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - t0
+
+        upstream = None
+        if args.standin_url:
+            upstream = (await client.get(f"{args.standin_url.rstrip('/')}/_stats")).json()["calls"]
+
+    lat = sorted(latencies)
+    print(f"requests:    {args.requests}  (concurrency {args.concurrency})")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"throughput:  {args.requests / elapsed:.1f} req/s")
+    print(f"status:      {dict(statuses)}")
+    if lat:
+        print(f"latency ms:  p50={_pct(lat, 50):.1f}  p95={_pct(lat, 95):.1f}  "
+              f"p99={_pct(lat, 99):.1f}  mean={statistics.fmean(lat):.1f}  max={lat[-1]:.1f}")
+    if upstream is not None:
+        total = sum(v for k, v in upstream.items() if ":" not in k)
+        print(f"upstream:    {upstream}  ({total / max(1, args.requests):.3f} chamadas/request)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--path", default="/api/powerbi/embed-info")
+    ap.add_argument("--report-id", action="append", required=True)
+    ap.add_argument("--username")
+    ap.add_argument("--roles")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--warmup", type=int, default=10)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--standin-url", help="URL do bench/pbi_standin.py, p/ contar chamadas upstream")
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
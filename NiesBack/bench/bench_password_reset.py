@@ -0,0 +1,54 @@
+"""
+Benchmark da validação de token de reset de senha: bcrypt (formato antigo, token_hash)
+vs HMAC-SHA256 (token_digest, services/password_reset.py).
+
+    python -m bench.bench_password_reset --iterations 50
+
+Mede só o custo de CPU por validação (sem banco), que é o que cada GET/POST de
+/auth/set-password pagava a mais no formato antigo.
+"""
+import argparse
+import secrets
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from services.password_reset import token_digest
+
+
+def _timeit(fn, iterations: int) -> list[float]:
+    out = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _report(name: str, ms: list[float]) -> float:
+    ms = sorted(ms)
+    mean = statistics.fmean(ms)
+    print(f"{name:<8} mean={mean:9.4f} ms  p50={ms[len(ms) // 2]:9.4f} ms  max={ms[-1]:9.4f} ms  "
+          f"({1000 / mean:,.0f} validações/s por núcleo)")
+    return mean
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--iterations", type=int, default=50)
+    ap.add_argument("--bcrypt-rounds", type=int, default=12, help="custo do bcrypt (padrão do passlib: 12)")
+    args = ap.parse_args()
+
+    raw = secrets.token_urlsafe(32)
+    ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.bcrypt_rounds)
+    legacy_hash = ctx.hash(raw)
+    digest = token_digest(raw)
+
+    bcrypt_ms = _report("bcrypt", _timeit(lambda: ctx.verify(raw, legacy_hash), args.iterations))
+    hmac_ms = _report("hmac", _timeit(lambda: token_digest(raw) == digest, args.iterations * 1000))
+    print(f"speedup: {bcrypt_ms / hmac_ms:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Stand-in local do Azure AD + Power BI REST, para testes de carga do routers/powerbi.py
+sem chamar a Microsoft.
+
+Sobe com:
+    uvicorn bench.pbi_standin:app --port 9000
+
+E aponta a API para ele (core/settings.py / .env):
+    AUTH_URL=http://127.0.0.1:9000/tenant/oauth2/v2.0/token
+    PBI_API=http://127.0.0.1:9000/v1.0/myorg
+
+Comportamento configurável por variável de ambiente (ou POST /_config em tempo de execução):
+    STANDIN_LATENCY_MS     latência média de cada resposta (default 80)
+    STANDIN_JITTER_MS      variação +/- uniforme sobre a latência (default 20)
+    STANDIN_ERROR_RATE     fração de respostas 500 (default 0)
+    STANDIN_THROTTLE_RATE  fração de respostas 429 (default 0)
+    STANDIN_RETRY_AFTER    segundos no header Retry-After dos 429 (default 1)
+    STANDIN_TOKEN_TTL      validade (s) dos tokens emitidos (default 3600)
+GET /_stats devolve a contagem de chamadas por endpoint; DELETE /_stats zera.
+"""
+import asyncio
+import os
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Power BI stand-in")
+
+config = {
+    "latency_ms": float(os.getenv("STANDIN_LATENCY_MS", "80")),
+    "jitter_ms": float(os.getenv("STANDIN_JITTER_MS", "20")),
+    "error_rate": float(os.getenv("STANDIN_ERROR_RATE", "0")),
+    "throttle_rate": float(os.getenv("STANDIN_THROTTLE_RATE", "0")),
+    "retry_after": int(os.getenv("STANDIN_RETRY_AFTER", "1")),
+    "token_ttl": int(os.getenv("STANDIN_TOKEN_TTL", "3600")),
+}
+calls: Counter = Counter()
+
+
+async def _simulate(endpoint: str) -> JSONResponse | None:
+    """Aplica latência e, conforme as taxas configuradas, devolve um 429/500 no lugar da resposta."""
+    calls[endpoint] += 1
+    delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+    await asyncio.sleep(max(0.0, delay) / 1000)
+
+    roll = random.random()
+    if roll < config["throttle_rate"]:
+        calls[f"{endpoint}:429"] += 1
+        return JSONResponse(
+            {"error": {"code": "TooManyRequests"}},
+            status_code=429,
+            headers={"Retry-After": str(config["retry_after"])},
+        )
+    if roll < config["throttle_rate"] + config["error_rate"]:
+        calls[f"{endpoint}:500"] += 1
+        return JSONResponse({"error": {"code": "InternalError"}}, status_code=500)
+    return None
+
+
+def _embed_token() -> dict:
+    exp = datetime.now(timezone.utc) + timedelta(seconds=config["token_ttl"])
+    return {
+        "token": f"standin-embed-{uuid.uuid4().hex}",
+        "tokenId": str(uuid.uuid4()),
+        "expiration": exp.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+@app.post("/{tenant}/oauth2/v2.0/token")
+async def aad_token(tenant: str):
+    if err := await _simulate("aad_token"):
+        return err
+    return {
+        "token_type": "Bearer",
+        "expires_in": config["token_ttl"],
+        "access_token": f"standin-app-{uuid.uuid4().hex}",
+    }
+
+
+@app.get("/v1.0/myorg/groups/{workspace_id}/reports/{report_id}")
+async def get_report(workspace_id: str, report_id: str):
+    if err := await _simulate("get_report"):
+        return err
+    return {
+        "id": report_id,
+        "name": f"Report {report_id}",
+        "datasetId": f"ds-{report_id}",
+        "embedUrl": f"https://app.powerbi.com/reportEmbed?reportId={report_id}&groupId={workspace_id}",
+    }
+
+
+@app.post("/v1.0/myorg/groups/{workspace_id}/reports/{report_id}/GenerateToken")
+async def generate_token(workspace_id: str, report_id: str):
+    if err := await _simulate("generate_token"):
+        return err
+    return _embed_token()
+
+
+@app.post("/v1.0/myorg/GenerateToken")
+async def generate_token_v2(request: Request):
+    if err := await _simulate("generate_token_v2"):
+        return err
+    body = await request.json()
+    if not body.get("reports") or not body.get("datasets"):
+        return JSONResponse({"error": {"code": "InvalidRequest"}}, status_code=400)
+    return _embed_token()
+
+
+@app.get("/_stats")
+def stats():
+    return {"calls": dict(calls), "config": config}
+
+
+@app.delete("/_stats")
+def reset_stats():
+    calls.clear()
+    return {"ok": True}
+
+
+@app.post("/_config")
+async def set_config(request: Request):
+    changes = await request.json()
+    for k, v in changes.items():
+        if k in config:
+            config[k] = type(config[k])(v)
+    return config
@@ -0,0 +1,37 @@
+# core/background.py
+# Tarefas periódicas em background (por worker), iniciadas/paradas no lifespan (main.py).
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+_tasks: dict[str, asyncio.Task] = {}
+
+
+async def _loop(name: str, interval: float, fn: Callable[[], Awaitable[None]], initial_delay: float) -> None:
+    await asyncio.sleep(initial_delay)
+    while True:
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # não deixa uma falha derrubar o loop; tenta de novo no próximo ciclo
+            logger.exception("Falha na tarefa periódica '%s'", name)
+        await asyncio.sleep(interval)
+
+
+def start_periodic(name: str, interval: float, fn: Callable[[], Awaitable[None]], initial_delay: float | None = None) -> None:
+    if name in _tasks and not _tasks[name].done():
+        return
+    delay = interval if initial_delay is None else initial_delay
+    _tasks[name] = asyncio.create_task(_loop(name, interval, fn, delay), name=name)
+
+
+async def stop_all() -> None:
+    tasks = list(_tasks.values())
+    _tasks.clear()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
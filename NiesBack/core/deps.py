@@ -1,21 +1,43 @@
 # core/deps.py (ou onde você guarda os deps globais)
 from fastapi import Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import get_db
-from core.menu import build_menu_for_user
+from db import get_async_db
+from core.menu import LazyMenu, build_menu_for_user
+from services.authz import AuthContext, resolve_auth_context
 from services.security import get_current_user_optional
 from models.models_rbac import User
 
-def with_menu(
+
+async def get_auth_context(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user: User | None = Depends(get_current_user_optional),
+) -> AuthContext:
+    """
+    Autorização do request (relatórios permitidos, admin, grupos visíveis).
+    O FastAPI resolve o dep 1x por request; with_menu e os handlers recebem o mesmo objeto,
+    e os templates o leem em request.state.auth.
+    """
+    auth = await resolve_auth_context(db, user)
+    request.state.auth = auth
+    return auth
+
+
+async def with_menu(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User | None = Depends(get_current_user_optional),
 ):
     """
     Injeta em request.state.menu apenas os grupos/subgrupos
     com pelo menos 1 relatório permitido ao usuário (ou ancestrais).
-    Admin vê tudo.
+    Admin vê tudo. Lazy: só é calculado se a página for renderizada (core/templates.render).
     """
-    request.state.menu = build_menu_for_user(db, user)
+    async def build():
+        # reusa o contexto do request se o handler já pediu get_auth_context
+        auth = getattr(request.state, "auth", None) or await resolve_auth_context(db, user)
+        return await build_menu_for_user(db, auth)
+
+    request.state.menu = LazyMenu(build)
     return None  # side-effect only
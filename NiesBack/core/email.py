@@ -1,5 +1,6 @@
 from email.message import EmailMessage
 import smtplib, ssl
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable
 from .settings import settings
 
@@ -35,19 +36,80 @@ def send_email(to: str | Iterable[str], subject: str, body_text: str, body_html:
         print("===========================")
         return
 
+    with _smtp_connection() as server:
+        server.send_message(msg)
+
+def _smtp_connection() -> smtplib.SMTP:
     context = ssl.create_default_context()
 
     if settings.MAIL_USE_SSL:
-        with smtplib.SMTP_SSL(settings.MAIL_HOST, settings.MAIL_PORT, context=context, timeout=20) as server:
-            if settings.MAIL_USERNAME and settings.MAIL_PASSWORD:
-                server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
-            server.send_message(msg)
+        server = smtplib.SMTP_SSL(settings.MAIL_HOST, settings.MAIL_PORT, context=context, timeout=20)
     else:
-        with smtplib.SMTP(settings.MAIL_HOST, settings.MAIL_PORT, timeout=20) as server:
+        server = smtplib.SMTP(settings.MAIL_HOST, settings.MAIL_PORT, timeout=20)
+    try:
+        if not settings.MAIL_USE_SSL:
             server.ehlo()
             if settings.MAIL_USE_TLS:
                 server.starttls(context=context)
                 server.ehlo()
-            if settings.MAIL_USERNAME and settings.MAIL_PASSWORD:
-                server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
-            server.send_message(msg)
+        if settings.MAIL_USERNAME and settings.MAIL_PASSWORD:
+            server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+    except Exception:
+        server.close()  # handshake/login falhou: não deixa o socket aberto
+        raise
+    return server
+
+def _send_chunk(messages: list[tuple]) -> list[str | None]:
+    # uma conexão SMTP por thread, reaproveitada p/ todas as mensagens do lote;
+    # a montagem da mensagem (lenta no pacote email) fica sobreposta à espera do SMTP
+    errors: list[str | None] = []
+    server = None
+    try:
+        for m in messages:
+            try:
+                msg = _build_message(*m)
+                if server is None:
+                    server = _smtp_connection()
+                server.send_message(msg)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e) or type(e).__name__)
+                try:
+                    server and server.quit()
+                except Exception:
+                    pass
+                server = None  # reconecta na próxima
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+    return errors
+
+def send_emails(
+    messages: list[tuple[str, str, str, str | None]],
+    concurrency: int | None = None,
+) -> list[str | None]:
+    """
+    Envio em massa: (to, subject, body_text, body_html) por mensagem.
+    Divide entre `concurrency` threads, cada uma com sua conexão SMTP.
+    Retorna, na mesma ordem, None (enviado) ou a mensagem de erro.
+    """
+    if settings.MAIL_DISABLED:
+        for to, subject, *_ in messages:
+            print(f"=== MAIL (DEV/disabled) === TO: {to} SUBJECT: {subject}")
+        return [None] * len(messages)
+    if not messages:
+        return []
+
+    n = max(1, min(concurrency or settings.MAIL_BULK_CONCURRENCY, len(messages)))
+    chunks = [messages[i::n] for i in range(n)]  # intercalado: lote i = mensagens i, i+n, i+2n...
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix="mail") as ex:
+        results = list(ex.map(_send_chunk, chunks))
+
+    errors: list[str | None] = [None] * len(messages)
+    for i, chunk_errors in enumerate(results):
+        for j, err in enumerate(chunk_errors):
+            errors[i + j * n] = err
+    return errors
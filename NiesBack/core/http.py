@@ -0,0 +1,137 @@
+# core/http.py
+# Cliente HTTP assíncrono compartilhado (1 por worker) para Azure AD e Power BI.
+# Criado/fechado no lifespan do app (main.py); reaproveita conexões (keep-alive).
+import logging
+from collections import Counter
+
+import httpx
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+_counters: Counter = Counter()
+_inflight = {"now": 0, "peak": 0, "http2": False}
+
+
+def _http2_enabled() -> bool:
+    if not settings.PBI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx[http2])
+    except ImportError:
+        logger.warning("PBI_HTTP2=true, mas o pacote 'h2' não está instalado; usando HTTP/1.1.")
+        return False
+    return True
+
+
+async def _on_request(request: httpx.Request) -> None:
+    _counters["requests"] += 1
+    _counters[f"requests:{request.url.host}"] += 1
+
+
+async def _on_response(response: httpx.Response) -> None:
+    _counters[f"status:{response.status_code // 100}xx"] += 1
+
+
+class _CountedStream(httpx.AsyncByteStream):
+    # a conexão só volta ao pool quando o corpo é lido/fechado
+    def __init__(self, stream: httpx.AsyncByteStream):
+        self._stream = stream
+        self._done = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._done:
+                self._done = True
+                _inflight["now"] -= 1
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """Conta requests em andamento (envio até o fechamento do corpo) só com a API pública do httpx."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        _inflight["now"] += 1
+        _inflight["peak"] = max(_inflight["peak"], _inflight["now"])
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            _inflight["now"] -= 1
+            raise
+        if response.is_closed:  # corpo já em memória (ex.: MockTransport)
+            _inflight["now"] -= 1
+        else:
+            response.stream = _CountedStream(response.stream)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = _http2_enabled()
+    _inflight["http2"] = http2
+    return httpx.AsyncClient(
+        transport=_CountingTransport(httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.PBI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PBI_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.PBI_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )),
+        timeout=httpx.Timeout(
+            connect=settings.PBI_HTTP_CONNECT_TIMEOUT,
+            read=settings.PBI_HTTP_READ_TIMEOUT,
+            write=settings.PBI_HTTP_READ_TIMEOUT,
+            pool=settings.PBI_HTTP_POOL_TIMEOUT,
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+async def start_http_client() -> None:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # fallback p/ scripts/testes que não passam pelo lifespan
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def http_pool_stats() -> dict:
+    # contadores próprios (transporte + event hooks), sem ler internals do httpcore
+    in_flight = _inflight["now"]
+    return {
+        "open": _client is not None and not _client.is_closed,
+        "http2": _inflight["http2"],
+        "max_connections": settings.PBI_HTTP_MAX_CONNECTIONS,
+        "max_keepalive": settings.PBI_HTTP_MAX_KEEPALIVE,
+        "in_flight": in_flight,
+        "peak_in_flight": _inflight["peak"],
+        # acima de max_connections os requests esperam conexão livre no pool
+        "queued_requests": max(0, in_flight - settings.PBI_HTTP_MAX_CONNECTIONS),
+        "counters": dict(_counters),
+    }
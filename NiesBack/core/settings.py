@@ -22,11 +22,44 @@ class Settings(BaseSettings):
     MAIL_USE_TLS: bool = True
     MAIL_USE_SSL: bool = False
     MAIL_DISABLED: bool = False  # desabilita envio real de emails (apenas loga) – para DEV
+    MAIL_BULK_CONCURRENCY: int = 8  # conexões SMTP simultâneas no envio em massa (core/email.send_emails)
+    USER_IMPORT_MAX_ROWS: int = 5000
 
     # Power BI
     PBI_SCOPE: str = "https://analysis.windows.net/powerbi/api/.default"
     AUTH_URL: str | None = None
     PBI_API: str = "https://api.powerbi.com/v1.0/myorg"
+    PBI_APP_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # renova o token do Azure AD 5 min antes de expirar
+    PBI_EMBED_TOKEN_REFRESH_MARGIN_SECONDS: int = 600  # renova o embed token 10 min antes de expirar
+    PBI_EMBED_TOKEN_STALE_WAIT_SECONDS: float = 1.5    # se o GenerateToken demorar mais, serve o token atual
+    PBI_EMBED_TOKEN_CACHE_MAX: int = 2000              # nº máx. de (report, identidade) em memória
+    PBI_REPORT_METADATA_TTL_SECONDS: int = 60 * 60 * 24      # embedUrl/datasetId quase nunca mudam
+    PBI_REPORT_METADATA_REFRESH_SECONDS: int = 60 * 30       # atualização periódica em background
+    PBI_INLINE_EMBED: bool = True                      # /report/{id} já vem com o embed config na página
+    PBI_INLINE_EMBED_WAIT_SECONDS: float = 0           # 0 = só cache quente; >0 = gera o token, esperando até N s
+    PBI_EMBED_RENEW_HANDLE_MAX_AGE_SECONDS: int = 60 * 60 * 24  # depois disso a página volta ao /embed-info
+
+    # Cliente HTTP compartilhado (Azure AD + Power BI) – ver core/http.py
+    PBI_HTTP_MAX_CONNECTIONS: int = 50
+    PBI_HTTP_MAX_KEEPALIVE: int = 20
+    PBI_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    PBI_HTTP2: bool = False            # requer httpx[http2]
+    PBI_HTTP_CONNECT_TIMEOUT: float = 5.0
+    PBI_HTTP_READ_TIMEOUT: float = 20.0
+    PBI_HTTP_POOL_TIMEOUT: float = 10.0
+
+    LOG_LEVEL: str = "INFO"  # logs da app (logging), no mesmo stderr do uvicorn
+
+    # Agendador das chamadas à API do Power BI – ver services/powerbi_scheduler.py
+    PBI_RATE_PER_WORKSPACE: float = 10.0      # requisições/s por workspace
+    PBI_BURST_PER_WORKSPACE: int = 20
+    PBI_QUEUE_MAX_WAIT_SECONDS: float = 5.0   # espera máx. na fila antes de responder 503
+    PBI_QUEUE_MAX_DEPTH: int = 200
+    PBI_RETRY_ATTEMPTS: int = 3
+    PBI_RETRY_BACKOFF_BASE: float = 0.2
+    PBI_RETRY_BACKOFF_MAX: float = 2.0
+    PBI_BREAKER_FAILURES: int = 5             # falhas seguidas p/ abrir o circuito
+    PBI_BREAKER_RESET_SECONDS: float = 30.0
 
     # pydantic v2
     model_config = SettingsConfigDict(
@@ -36,15 +69,45 @@ class Settings(BaseSettings):
     )
     
     DB_URL: str
+    DB_ASYNC_URL: str | None = None   # opcional; padrão: DB_URL com driver asyncpg
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    THREADPOOL_SIZE: int = 40         # threads p/ o que ainda bloqueia: SMTP, arquivos, rotas síncronas com bcrypt (padrão do AnyIO)
 
     SECRET_KEY: str
-
+    ACCESS_TOKEN_EXPIRES_SECONDS: int = 60             # vida curta: token vazado/revogado vale no máx. 1 min
+    REFRESH_TOKEN_EXPIRES_SECONDS: int = 60 * 60 * 24 * 7
+    ACCESS_TOKEN_RENEW_BEFORE_SECONDS: int = 20       # reemite o cookie só quando faltar menos que isso
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 30          # sync do conjunto de revogação (services/token_revocation.py)
+    PASSWORD_HASH_WORKERS: int = 2     # bcrypt em paralelo (executor dedicado, services/password_hashing.py)
+    PASSWORD_HASH_QUEUE_MAX: int = 16  # além disso na fila → 503
+    PASSWORD_HASH_BUDGET_MS: float = 250  # custo do bcrypt calibrado no startup p/ caber nisso
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    PASSWORD_HASH_MAX_ROUNDS: int = 14
+    PASSWORD_HASH_ROUNDS: int | None = None  # fixa o custo (pula a calibração)
+    LOGIN_LIMIT_PER_EMAIL: int = 5            # tentativas de login por e-mail na janela
+    LOGIN_LIMIT_PER_IP: int = 30              # tentativas de login por IP na janela
+    LOGIN_LIMIT_WINDOW_SECONDS: int = 60 * 5
+    RATE_LIMIT_MAX_KEYS: int = 100_000        # contadores em memória (LRU) por worker
+    RATE_LIMIT_REDIS_URL: str | None = None   # opcional: limites compartilhados entre workers
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30     # cache do usuário logado (services/principal.py)
+    PRINCIPAL_CACHE_MAX: int = 10000
+    AUTHZ_INDEX_TTL_SECONDS: int = 60         # relatórios permitidos por grupo (services/authz.py)
+    CATALOG_TTL_SECONDS: int = 60 * 5         # snapshot de grupos/relatórios (services/catalog.py)
+    DB_QUERY_COUNT_HEADER: bool = False       # X-DB-Queries em cada resposta (diagnóstico/testes)
+    CATALOG_PAGE_SIZE: int = 24               # cards por página (home, grupo, /api/catalog)
+    CATALOG_PAGE_SIZE_MAX: int = 100
+    CATALOG_MAX_IN_IDS: int = 500             # acima disso a visibilidade vai por semijoin, não IN (services/report_catalog.py)
+    CATALOG_SUMMARY_CHARS: int = 300          # corte da descrição nos cards
 
     INVITE_EXPIRES_SECONDS : int =  60 * 60 * 2  # 2h
     INVITE_SALT : str =  "invite-email-flow"      # personalize
     PUBLIC_BASE_URL : str = "http://127.0.0.1:8000"
 
     PASSWORD_RESET_EXPIRES_SECONDS: int = 60 * 60 * 2
+    PASSWORD_RESET_RETENTION_SECONDS: int = 60 * 60 * 24  # resets expirados ficam 1 dia antes da limpeza
+    USER_MAINTENANCE_INTERVAL_SECONDS: int = 60 * 60      # services/maintenance.py
+    MAINTENANCE_PURGE_BATCH: int = 1000
     # AZURE_REDIRECT_URI: str
 
     
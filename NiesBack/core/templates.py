@@ -1,2 +1,13 @@
 from fastapi.templating import Jinja2Templates
-templates = Jinja2Templates(directory="templates")
\ No newline at end of file
+
+from core.menu import LazyMenu
+
+templates = Jinja2Templates(directory="templates")
+
+
+async def render(name: str, context: dict, **kwargs):
+    """TemplateResponse das páginas com menu (core/deps.with_menu): carrega o menu antes, o Jinja não faz await."""
+    menu = getattr(context["request"].state, "menu", None)
+    if isinstance(menu, LazyMenu):
+        await menu.load()
+    return templates.TemplateResponse(name, context, **kwargs)
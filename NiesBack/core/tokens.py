@@ -9,6 +9,11 @@ def make_invite_token(payload: dict) -> str:
     # payload: { "email": ..., "name": ..., "cpf": ..., "phone": ..., "valid_from": "YYYY-MM-DD"|None, "valid_to": "YYYY-MM-DD"|None, "group_ids": [...] }
     return _serializer().dumps(payload)
 
+def make_invite_tokens(payloads: list[dict]) -> list[str]:
+    # importação em massa: um serializer só p/ o lote todo
+    s = _serializer()
+    return [s.dumps(p) for p in payloads]
+
 # Verifica expiração usando max_age (em segundos). Se passou, levanta SignatureExpired.
 def read_invite_token(token: str, max_age_seconds: int) -> dict:
     s = _serializer()
@@ -20,3 +25,17 @@ def read_invite_token(token: str, max_age_seconds: int) -> dict:
     except BadSignature as e:
         # token inválido
         raise
+
+
+# Handle de renovação do embed token (Power BI): identifica o relatório já resolvido
+# sem precisar consultar o banco/Power BI de novo. Ver routers/powerbi.py (/embed-token).
+EMBED_RENEW_SALT = "pbi-embed-renew"
+
+def make_embed_renewal_handle(payload: dict) -> str:
+    return URLSafeTimedSerializer(secret_key=settings.SECRET_KEY, salt=EMBED_RENEW_SALT).dumps(payload)
+
+def read_embed_renewal_handle(handle: str, max_age_seconds: int) -> dict:
+    # levanta SignatureExpired/BadSignature, como read_invite_token
+    return URLSafeTimedSerializer(secret_key=settings.SECRET_KEY, salt=EMBED_RENEW_SALT).loads(
+        handle, max_age=max_age_seconds
+    )
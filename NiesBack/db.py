@@ -1,10 +1,21 @@
 # db.py
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from core.settings import settings
 
 
-engine = create_engine(settings.DB_URL, future=True)
+engine = create_engine(
+    settings.DB_URL,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 def get_db():
@@ -13,3 +24,56 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------- Async (para rotas `async def`: não bloqueiam o event loop) ----------
+def _async_db_url():
+    # DB_ASYNC_URL explícita, ou a mesma DB_URL trocando o driver (psycopg2 -> asyncpg)
+    if settings.DB_ASYNC_URL:
+        return settings.DB_ASYNC_URL
+    url = make_url(settings.DB_URL)
+    if url.get_backend_name() == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+async_engine = create_async_engine(
+    _async_db_url(),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+
+# ---------- Contador de queries por request (ver main.count_db_queries) ----------
+# lista mutável: threads do AnyIO recebem uma CÓPIA do contexto, mas apontando p/ o mesmo objeto
+_query_counter: ContextVar[list[int] | None] = ContextVar("query_counter", default=None)
+
+
+def _count_query(*_args) -> None:
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+event.listen(engine, "before_cursor_execute", _count_query)
+event.listen(async_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+@contextmanager
+def count_queries():
+    """`with count_queries() as n: ...; n[0]` = nº de queries (sync e async) executadas no bloco."""
+    counter = [0]
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
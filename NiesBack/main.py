@@ -1,3 +1,6 @@
+from contextlib import asynccontextmanager
+import logging
+import anyio.to_thread
 from fastapi import FastAPI, Request
  
 from fastapi.staticfiles import StaticFiles
@@ -17,11 +20,45 @@ from routers.userRegister import router as userRegister
 from routers.panelDetail import router as panelDetail
 from routers.editPanel import router as editPanel
 from routers.media_uploads import router as media_router, mount_media
+from routers.catalog import router as catalog
+
+from core.http import start_http_client, close_http_client
+from core.background import start_periodic, stop_all
+from core.settings import settings
+from routers.powerbi import refresh_report_metadata
+from services.token_revocation import sync_revocations
+from services.security import set_access_cookie
+from services.password_hashing import calibrate_password_hashing
+from services.maintenance import run_user_maintenance
+from db import async_engine, count_queries
  
 # ___________________________________________
+
+# logs de core/* e services/* (logging.getLogger(__name__)) com nível e origem
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)  # sem 1 linha por chamada ao Azure AD / Power BI
+ 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # threads só p/ o que ainda bloqueia (SMTP, arquivos, rotas síncronas com bcrypt); páginas usam AsyncSession
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # custo do bcrypt conforme a CPU deste pod
+    await calibrate_password_hashing()
+    # cliente HTTP compartilhado (Azure AD / Power BI) – 1 por worker
+    await start_http_client()
+    start_periodic("pbi-report-metadata", settings.PBI_REPORT_METADATA_REFRESH_SECONDS, refresh_report_metadata)
+    start_periodic("token-revocations", settings.TOKEN_REVOCATION_SYNC_SECONDS, sync_revocations, initial_delay=0)
+    start_periodic("user-maintenance", settings.USER_MAINTENANCE_INTERVAL_SECONDS, run_user_maintenance, initial_delay=60)
+    try:
+        yield
+    finally:
+        await stop_all()
+        await close_http_client()
+        await async_engine.dispose()
  
  
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
  
 # static em /static
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -36,6 +73,27 @@ async def csp_upgrade(request: Request, call_next):
     resp.headers["Content-Security-Policy"] = \
         "upgrade-insecure-requests; block-all-mixed-content"
     return resp
+
+
+@app.middleware("http")
+async def apply_auth_cookies(request: Request, call_next):
+    resp = await call_next(request)
+    # access_token reemitido por get_current_user_optional (services/security.py)
+    token = getattr(request.state, "access_cookie", None)
+    if token:
+        set_access_cookie(resp, token)
+    return resp
+
+
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    # diagnóstico: nº de queries (sync + async) do request em X-DB-Queries
+    if not settings.DB_QUERY_COUNT_HEADER:
+        return await call_next(request)
+    with count_queries() as n:
+        resp = await call_next(request)
+    resp.headers["X-DB-Queries"] = str(n[0])
+    return resp
  
  
 app.include_router(powerbi_router)
@@ -50,6 +108,7 @@ app.include_router(userRegister)
 app.include_router(panelDetail)
 app.include_router(media_router)
 app.include_router(editPanel)
+app.include_router(catalog)
  
  
 from fastapi.middleware.cors import CORSMiddleware
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Boolean, Integer, ForeignKey, UniqueConstraint, Enum as SAEnum
+from sqlalchemy import String, Boolean, Integer, ForeignKey, Index, UniqueConstraint, Enum as SAEnum
 import enum
 
 class Base(DeclarativeBase): ...
@@ -16,10 +16,19 @@ class Group(Base):
     children: Mapped[list["Group"]] = relationship(back_populates="parent", cascade="all, delete")
     reports: Mapped[list["Report"]] = relationship(back_populates="group", cascade="all, delete-orphan")
 
+class GroupClosure(Base):
+    """Todos os pares (ancestral, descendente) da árvore de grupos; depth 0 = o próprio grupo."""
+    __tablename__ = "group_closure"
+    __table_args__ = (Index("ix_group_closure_descendant_depth", "descendant_id", "depth"),)
+    ancestor_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (Index("ix_reports_catalog_order", "sort_order", "name", "id"),)  # keyset do catálogo
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
-    group_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"))
+    group_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), index=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     sort_order: Mapped[int | None] = mapped_column(Integer, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
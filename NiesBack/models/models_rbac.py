@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from sqlalchemy import (
-    String, Boolean, Integer, Date, DateTime, Enum, ForeignKey, UniqueConstraint
+    String, Boolean, Integer, Date, DateTime, Enum, ForeignKey, UniqueConstraint, Index
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
@@ -23,6 +23,11 @@ class UserStatus(str, enum.Enum):
 # -----------------------------------------
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # job de manutenção (services/maintenance.py): promove/expira por status + data
+        Index("ix_users_status_valid_from", "status", "valid_from"),
+        Index("ix_users_status_valid_to", "status", "valid_to"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
@@ -36,6 +41,7 @@ class User(Base):
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # incrementar revoga os tokens
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -133,8 +139,9 @@ class PasswordReset(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     reset_id: Mapped[str] = mapped_column(String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
-    token_hash: Mapped[str] = mapped_column(String(255), nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    token_hash: Mapped[str | None] = mapped_column(String(255), nullable=True)  # legado: bcrypt do token
+    token_digest: Mapped[str | None] = mapped_column(String(64), unique=True, index=True, nullable=True)  # HMAC-SHA256 do token
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True, nullable=False)
     used_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
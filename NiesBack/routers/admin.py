@@ -1,78 +1,85 @@
 # routes_admin_groups.py
 from fastapi import APIRouter, Depends, HTTPException, status   
-from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models.models import Report
 from models.models_rbac import UserGroup, User
 from services.security import require_admin
+from services.password_hashing import password_hashing_stats
+from services.authz import invalidate_authz
 from typing import List
-import uuid
 from models.models_rbac import GroupReportPermission
 from schemas.schemas_rbac import UserGroupCreate, UserGroupOut, ReportIdsIn
 
 router = APIRouter()
 
 @router.get("/user-groups")  # lista grupos (esquerda)
-def list_user_groups(
-    db: Session = Depends(get_db),
+async def list_user_groups(
+    db: AsyncSession = Depends(get_async_db),
     _u: User = Depends(require_admin),
 ):
-    rows = db.query(UserGroup).order_by(UserGroup.name.asc()).all()
+    rows = (await db.execute(select(UserGroup).order_by(UserGroup.name.asc()))).scalars().all()
     return [{"id": g.id, "name": g.name, "description": g.description} for g in rows]
 
 @router.get("/reports")  # lista painéis (direita)
-def list_reports(
-    db: Session = Depends(get_db),
+async def list_reports(
+    db: AsyncSession = Depends(get_async_db),
     _u: User = Depends(require_admin),
 ):
-    rows = (
-        db.query(Report)
-          .filter(Report.is_active == True)
+    rows = (await db.execute(
+        select(Report.id, Report.name, Report.is_public)
+          .where(Report.is_active == True)
           .order_by(Report.is_public.desc(), Report.name.asc())
-          .all()
-    )
+    )).all()
     return {
         "public":  [{"id": r.id, "name": r.name} for r in rows if r.is_public],
         "private": [{"id": r.id, "name": r.name} for r in rows if not r.is_public],
     }   
     
 @router.get("/user-groups/{group_id}/report-ids")
-def get_group_report_ids(
-    group_id: str,
-    db: Session = Depends(get_db),
+async def get_group_report_ids(
+    group_id: int,
+    db: AsyncSession = Depends(get_async_db),
     _u: User = Depends(require_admin),
 ):
-    ok = db.query(UserGroup).filter(UserGroup.id == group_id).first()
+    ok = await db.get(UserGroup, group_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Grupo de usuário não encontrado.")
-    rows = (
-        db.query(GroupReportPermission.report_id)
-          .filter(GroupReportPermission.group_id == group_id)
-          .all()
+    rows = await db.execute(
+        select(GroupReportPermission.report_id)
+          .where(GroupReportPermission.group_id == group_id)
     )
-    return [r[0] for r in rows]  # lista de IDs
+    return list(rows.scalars())  # lista de IDs
 
 @router.put("/user-groups/{group_id}/report-ids", status_code=status.HTTP_204_NO_CONTENT)
-def set_group_report_ids(
-    group_id: str,
+async def set_group_report_ids(
+    group_id: int,
     payload: ReportIdsIn,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _u: User = Depends(require_admin),
 ):
-    grp = db.query(UserGroup).filter(UserGroup.id == group_id).first()
+    grp = await db.get(UserGroup, group_id)
     if not grp:
         raise HTTPException(status_code=404, detail="Grupo de usuário não encontrado.")
 
     # valida IDs de reports
     if payload.report_ids:
-        found = {r.id for r in db.query(Report.id).filter(Report.id.in_(payload.report_ids)).all()}
+        found = set((await db.execute(select(Report.id).where(Report.id.in_(payload.report_ids)))).scalars())
         missing = set(payload.report_ids) - found
         if missing:
             raise HTTPException(status_code=400, detail=f"Reports inexistentes: {', '.join(sorted(missing))}")
 
     # apaga permissões atuais e recria (idempotente + simples)
-    db.query(GroupReportPermission).filter(GroupReportPermission.group_id == group_id).delete()
+    await db.execute(delete(GroupReportPermission).where(GroupReportPermission.group_id == group_id))
     for rep_id in payload.report_ids:
-        db.add(GroupReportPermission(id=str(uuid.uuid4()), group_id=group_id, report_id=rep_id))
-    db.commit()
+        db.add(GroupReportPermission(group_id=group_id, report_id=rep_id))
+    await db.commit()
+    invalidate_authz()
     return
+
+
+@router.get("/admin/password-hashing/stats", include_in_schema=False)
+def password_hashing_metrics(_u: User = Depends(require_admin)):
+    # fila/latência do executor de bcrypt (services/password_hashing.py)
+    return password_hashing_stats()
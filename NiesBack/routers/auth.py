@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_db, get_async_db
 from models.models_rbac import User, UserStatus
 from schemas.schemas_rbac import UserCreate, LoginIn, TokenOut, UserOut
 from services.security import *
@@ -9,13 +11,16 @@ from fastapi.responses import HTMLResponse
 from core.templates import templates
 from starlette import status as http_status
 from services.password_reset import get_valid_password_reset, mark_used, hash_password
+from services.principal import invalidate_principal
+from services.token_revocation import is_revoked, revoke_user_tokens
+from services.password_hashing import verify_and_update_async
+from services.rate_limit import check_login_rate
 
 # from services.reset_password import send_reset_code
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-ACCESS_EXPIRES = timedelta(minutes=1)
-REFRESH_EXPIRES = timedelta(days=7)
+# ACCESS_EXPIRES / REFRESH_EXPIRES vêm de services.security (configuráveis em core/settings.py)
 
 def _normalize_email(email: str) -> str:
     return (email or "").strip().lower()
@@ -56,16 +61,29 @@ def login_page(request: Request):
 
 
 @router.post("/login", response_model=TokenOut)
-def login(data: LoginIn, response: Response, db: Session = Depends(get_db)):
+async def login(data: LoginIn, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # async: enquanto o bcrypt roda no executor dedicado, nenhuma thread fica presa
+    # limite por e-mail/IP antes de qualquer acesso ao banco ou ao bcrypt
+    await check_login_rate(_normalize_email(data.email), request.client.host if request.client else None)
     invalid_err = HTTPException(401, "E-mail ou senha inválidos.")
-    u = db.query(User).filter(User.email == _normalize_email(data.email)).first()
+    u = (
+        await db.execute(select(User).where(User.email == _normalize_email(data.email)))
+    ).scalars().first()
     if u:
     # Se não tem senha definida ainda (ex.: acabou de confirmar convite)
         if u.password_hash == "" :
             raise HTTPException(status_code=403, detail="Defina sua senha pelo link enviado por e-mail.")
 
-    if not u or not verify_password(data.password, u.password_hash):
+    if not u:
         raise invalid_err
+    ok, new_hash = await verify_and_update_async(data.password, u.password_hash)
+    if not ok:
+        raise invalid_err
+    if new_hash:
+        # custo do hash fora da política atual (ver services/password_hashing.py): regrava
+        u.password_hash = new_hash
+        db.add(u)
+        await db.commit()
 
     today = date.today()
 
@@ -73,6 +91,10 @@ def login(data: LoginIn, response: Response, db: Session = Depends(get_db)):
     if u.valid_to and today > u.valid_to:
         raise HTTPException(status_code=403, detail=f"Seu período de acesso expirou em {u.valid_to.strftime('%d/%m/%Y')}.")
 
+    # bloqueado (pelo admin ou fim da vigência, ver services/maintenance.py): só o admin reativa
+    if u.status == UserStatus.blocked:
+        raise HTTPException(status_code=403, detail="Usuário bloqueado. Procure o administrador.")
+
     # 2) Se não está aprovado, avalia janela: se já pode, aprova; senão bloqueia
     if u.status != UserStatus.approved:
         inside_window = (
@@ -82,8 +104,9 @@ def login(data: LoginIn, response: Response, db: Session = Depends(get_db)):
         if inside_window:
             u.status = UserStatus.approved
             db.add(u)
-            db.commit()
-            db.refresh(u)
+            await db.commit()
+            await db.refresh(u)
+            invalidate_principal(u.id)
         else:
             if u.valid_from and today < u.valid_from:
                 # ainda não chegou a data de início
@@ -92,37 +115,21 @@ def login(data: LoginIn, response: Response, db: Session = Depends(get_db)):
             raise HTTPException(status_code=403, detail="Usuário não aprovado.")
 
     # 3) Tudo ok → emite tokens e cookies
-    access = create_access_token(sub=str(u.id), is_admin=u.is_admin, expires_delta=ACCESS_EXPIRES)
-    refresh = create_refresh_token(sub=str(u.id), expires_delta=REFRESH_EXPIRES)
-
-    response.set_cookie(
-        key="access_token",
-        value=access,
-        httponly=True,
-        secure=False,   # Produção + HTTPS => True
-        samesite="lax",
-        path="/",
-        max_age=int(ACCESS_EXPIRES.total_seconds()),
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        path="/",
-        max_age=int(REFRESH_EXPIRES.total_seconds()),
-    )
+    access = create_access_token(sub=str(u.id), is_admin=u.is_admin, expires_delta=ACCESS_EXPIRES, ver=u.token_version)
+    refresh = create_refresh_token(sub=str(u.id), expires_delta=REFRESH_EXPIRES, ver=u.token_version)
+
+    set_access_cookie(response, access)   # Produção + HTTPS => secure=True
+    set_refresh_cookie(response, refresh)
     return TokenOut(access_token=access, refresh_token=refresh)
 
 
 
 @router.post("/refresh", response_model=TokenOut)
-def refresh_token(
+async def refresh_token(
     request: Request,
     response: Response,
     payload: Optional[TokenOut] = None,                      # permite body opcional
-    db: Annotated[Session, Depends(get_db)] = None,
+    db: Annotated[AsyncSession, Depends(get_async_db)] = None,
 ):
     """
     Emite um novo access_token (e rotaciona o refresh_token, opcionalmente).
@@ -134,54 +141,41 @@ def refresh_token(
     if not rt:
         raise HTTPException(400, "Missing refresh_token")
 
-    # 2) Validar e checar revogação
+    # 2) Validar e checar revogação (em memória, ver services/token_revocation.py)
     claims = decode_token_safely(rt, verify_type="refresh")
-    if not claims:
+    if not claims or is_revoked(claims):
         raise HTTPException(401, "Invalid refresh token")
 
     sub = claims.get("sub")
     if not sub:
         raise HTTPException(401, "Invalid refresh token")
 
-    # 3) Carregar usuário
-    # (use db.get em vez de query().get)
-    u = db.get(User, int(sub))
+    # 3) Carregar usuário (cache de Principal)
+    u = await get_principal(db, int(sub))
     if not u or u.status != UserStatus.approved:
         raise HTTPException(403, "User not allowed")
+    if is_revoked(claims, u.token_version):
+        raise HTTPException(401, "Invalid refresh token")
 
     # 4) Emitir novo access
     new_access = create_access_token(
         sub=str(u.id),
         is_admin=u.is_admin,
         expires_delta=ACCESS_EXPIRES,
+        ver=u.token_version,
     )
 
     # 5) (Opcional, recomendado) Rotacionar o refresh
 
-    new_refresh, = create_refresh_token(
+    new_refresh = create_refresh_token(
         sub=str(u.id),
         expires_delta=REFRESH_EXPIRES,
+        ver=u.token_version,
     )
 
     # 6) Atualizar cookies
-    response.set_cookie(
-        key="access_token",
-        value=new_access,
-        httponly=True,
-        secure=False,      # True em produção com HTTPS
-        samesite="lax",    # "none" se front for outra origem/porta (com HTTPS)
-        path="/",
-        max_age=int(ACCESS_EXPIRES.total_seconds()),
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=new_refresh,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        path="/",
-        max_age=int(REFRESH_EXPIRES.total_seconds()),
-    )
+    set_access_cookie(response, new_access)
+    set_refresh_cookie(response, new_refresh)
 
     # 7) Retornar também no body (útil se o front usa Bearer em chamadas XHR)
     return TokenOut(access_token=new_access, refresh_token=new_refresh)
@@ -236,8 +230,10 @@ def set_password_submit(
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
     user.password_hash = hash_password(password)
+    revoke_user_tokens(db, user)  # sessões abertas com a senha antiga deixam de valer
     db.add(user)
     db.commit()
+    invalidate_principal(user.id)
 
     mark_used(db, pr)
 
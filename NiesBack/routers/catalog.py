@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from db import get_async_db
+from core.settings import settings
+from models.models import AccessLevel
+from models.models_rbac import User
+from services.authz import AuthContext, get_authz_index_async
+from services.security import get_current_user_optional
+from services.report_catalog import build_page, decode_cursor, facets_query, page_query
+
+router = APIRouter(prefix="/api/catalog", tags=["catalog"])
+
+
+@router.get("/reports")
+async def list_catalog_reports(
+    group_id: Optional[str] = None,
+    is_public: Optional[bool] = None,
+    level: Optional[AccessLevel] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.CATALOG_PAGE_SIZE, ge=1, le=settings.CATALOG_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    user: User | None = Depends(get_current_user_optional),
+):
+    """
+    Cards de relatórios visíveis ao usuário, paginados por cursor (`next_cursor`).
+    Sem cursor (1ª página) devolve também `facets.access_level` (contagem por nível).
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    auth = AuthContext(await get_authz_index_async(db), user)
+    rows = (await db.execute(
+        page_query(auth, group_id=group_id, is_public=is_public, level=level, cursor=after, limit=limit)
+    )).all()
+    facets = None
+    if after is None:
+        facets = (await db.execute(facets_query(auth, group_id=group_id, is_public=is_public))).all()
+    return build_page(rows, limit, facets)
@@ -1,83 +1,50 @@
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse
 
-from db import get_db
-from models.models import Group, Report
-from models.models_rbac import User, UserGroupMember, GroupReportPermission
+from db import get_async_db
+from core.settings import settings
+from models.models_rbac import User
+from services.authz import AuthContext
+from services.catalog import get_catalog
+from services.report_catalog import build_page, page_query
 from services.security import get_current_user_optional
-from core.templates import templates
-from core.deps import with_menu
+from core.templates import render
+from core.deps import get_auth_context, with_menu
 
 router = APIRouter(prefix="/grupo", tags=["grupo"], dependencies=[Depends(with_menu)])
 
-def build_breadcrumb(db: Session, group: Group) -> list[dict]:
-    """Sobe pelos pais até a raiz e devolve [ {id,name}, ... ] """
-    gmap = {g.id: g for g in db.query(Group).all()}
-    trail = []
-    seen = set()
-    gid = group.id
-    # inclui o atual e vai subindo
-    while gid and gid in gmap and gid not in seen:
-        gg = gmap[gid]
-        trail.append({"id": gg.id, "name": gg.name})
-        seen.add(gid)
-        gid = gg.parent_id
-    trail.reverse()
-    return trail
-
 @router.get("/{grupo_id}", response_class=HTMLResponse, include_in_schema=False)
-def group_view(
+async def group_view(
     request: Request,
     grupo_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User | None = Depends(get_current_user_optional),
+    auth: AuthContext = Depends(get_auth_context),
 ):
+    cat = await get_catalog(db)
+
     # --- grupo atual ---
-    grupo = db.query(Group).filter(Group.id == grupo_id, Group.is_active.is_(True)).first()
-    if not grupo:
+    grupo = cat.groups.get(grupo_id)
+    if not grupo or not grupo.is_active:
         raise HTTPException(status_code=404, detail="Grupo não encontrado")
 
-    # --- subgrupos (somente 1º nível) ---
-    subgrupos = (
-        db.query(Group)
-          .filter(Group.parent_id == grupo_id, Group.is_active.is_(True))
-          .order_by(Group.name.asc())
-          .all()
-    )
-
-    # --- relatórios do grupo (permissão) ---
-    q = db.query(Report).filter(Report.is_active.is_(True), Report.group_id == grupo_id)
+    # --- subgrupos (somente 1º nível, já ordenados) ---
+    subgrupos = [cat.groups[gid] for gid in grupo.children]
 
-    if user and getattr(user, "is_admin", False):
-        reports = q.order_by(Report.sort_order.is_(None), Report.sort_order.asc(), Report.name.asc()).all()
-    elif user:
-        allowed_subq = (
-            db.query(GroupReportPermission.report_id)
-              .join(UserGroupMember, UserGroupMember.group_id == GroupReportPermission.group_id)
-              .filter(UserGroupMember.user_id == user.id)
-        )
-        reports = (
-            q.filter(or_(Report.is_public.is_(True), Report.id.in_(allowed_subq)))
-             .order_by(Report.sort_order.is_(None), Report.sort_order.asc(), Report.name.asc())
-             .all()
-        )
-    else:
-        reports = (
-            q.filter(Report.is_public.is_(True))
-             .order_by(Report.sort_order.is_(None), Report.sort_order.asc(), Report.name.asc())
-             .all()
-        )
+    # --- relatórios do grupo (permissão): 1ª página; o resto via /api/catalog/reports ---
+    limit = settings.CATALOG_PAGE_SIZE
+    page = build_page((await db.execute(page_query(auth, group_id=grupo_id, limit=limit))).all(), limit)
 
-    breadcrumb = build_breadcrumb(db, grupo)
+    breadcrumb = cat.breadcrumb(grupo_id)
 
     ctx = {
         "request": request,
         "user": user,
         "grupo": grupo,
         "subgrupos": subgrupos,
-        "reports": reports,
+        "reports": page["items"],
+        "next_cursor": page["next_cursor"],
         "breadcrumb": breadcrumb,
     }
-    return templates.TemplateResponse("painel-grupo.html", ctx)
\ No newline at end of file
+    return await render("painel-grupo.html", ctx)
\ No newline at end of file
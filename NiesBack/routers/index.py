@@ -1,60 +1,44 @@
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
 
-from db import get_db
-from models.models import Report
-from models.models_rbac import User, UserGroupMember, GroupReportPermission
+from db import get_async_db
+from core.settings import settings
+from models.models_rbac import User
+from services.authz import AuthContext
+from services.report_catalog import build_page, page_query
 from services.security import get_current_user_optional
-from core.templates import templates
-from core.deps import with_menu
+from core.templates import render
+from core.deps import get_auth_context, with_menu
 
 
 router = APIRouter(dependencies=[Depends(with_menu)])
 
 @router.get("/", response_class=HTMLResponse, include_in_schema=False)
-def home(
+async def home(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User | None = Depends(get_current_user_optional),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     # ----------------- REPORTS -----------------
-    q = db.query(Report).filter(Report.is_active.is_(True))
-    pending_count = 0
+    # só a 1ª página de cards; o resto vem de /api/catalog/reports conforme o scroll
+    limit = settings.CATALOG_PAGE_SIZE
+    page = build_page((await db.execute(page_query(auth, limit=limit))).all(), limit)
 
-    if user and getattr(user, "is_admin", False):
-        rows = q.order_by(
-            Report.sort_order.is_(None),
-            Report.sort_order.asc(),
-            Report.name.asc()
-        ).all()
-        pending_count = db.query(func.count(User.id))\
-                          .filter(User.status == "pending")\
-                          .scalar()
-    elif user:
-        allowed_subq = (
-            db.query(GroupReportPermission.report_id)
-              .join(UserGroupMember, UserGroupMember.group_id == GroupReportPermission.group_id)
-              .filter(UserGroupMember.user_id == user.id)
+    pending_count = 0
+    if auth.is_admin:
+        pending_count = await db.scalar(
+            select(func.count(User.id)).where(User.status == "pending")
         )
-        rows = (q.filter(or_(Report.is_public.is_(True), Report.id.in_(allowed_subq)))
-                  .order_by(Report.sort_order.is_(None),
-                            Report.sort_order.asc(),
-                            Report.name.asc())
-                  .all())
-    else:
-        rows = (q.filter(Report.is_public.is_(True))
-                  .order_by(Report.sort_order.is_(None),
-                            Report.sort_order.asc(),
-                            Report.name.asc())
-                  .all())
 
     # envia o menu pro base.html
     ctx = {
         "request": request,
         "user": user,
-        "reports": rows,
+        "reports": page["items"],
+        "next_cursor": page["next_cursor"],
         "pending_users_count": pending_count
     }
-    return templates.TemplateResponse("index.html", ctx)
+    return await render("index.html", ctx)
@@ -3,6 +3,7 @@ from pathlib import Path
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,20 +24,23 @@ ALLOWED_KINDS = {
 def _ensure_media():
     MEDIA_DIR.mkdir(parents=True, exist_ok=True)
 
+def _save_upload(file: UploadFile, path: Path) -> None:
+    with path.open("wb") as out:
+        shutil.copyfileobj(file.file, out)
+
 @router.post("/upload/image")
 async def upload_image(file: UploadFile = File(...)):
     # 1) checagem rápida por content-type
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Arquivo não é imagem.")
 
-    # 2) grava temporário
+    # 2) grava temporário (I/O de disco/NFS bloqueante: fora do event loop)
     tmp_name = f"{uuid.uuid4().hex}.bin"
     tmp_path = MEDIA_DIR / tmp_name
-    with tmp_path.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
+    await run_in_threadpool(_save_upload, file, tmp_path)
 
     # 3) detecta tipo real
-    kind = imghdr.what(tmp_path)  # 'jpeg', 'png', 'gif', 'webp', ...
+    kind = await run_in_threadpool(imghdr.what, tmp_path)  # 'jpeg', 'png', 'gif', 'webp', ...
     ext = ALLOWED_KINDS.get(kind)
     if not ext:
         tmp_path.unlink(missing_ok=True)
@@ -45,7 +49,7 @@ async def upload_image(file: UploadFile = File(...)):
     # 4) renomeia pra chave final estável
     final_name = f"{uuid.uuid4().hex}{ext}"
     final_path = MEDIA_DIR / final_name
-    tmp_path.rename(final_path)
+    await run_in_threadpool(tmp_path.rename, final_path)
 
     return {"key": final_name, "url": f"{MEDIA_URL}/{final_name}"}
 
@@ -1,43 +1,264 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-import httpx # usada para fazer requisições HTTP assíncronas
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+import asyncio
+import logging
+from functools import partial
+from datetime import datetime, timezone
 from models.models import Report
-from db import get_db
+from models.models_rbac import User
+from schemas.schemas import EmbedBatchIn, EmbedRenewIn
+from db import get_async_db
 from core.settings import settings, AUTH_URL
+from core.http import get_http_client, http_pool_stats
+from core.tokens import make_embed_renewal_handle, read_embed_renewal_handle
+from services.powerbi_cache import ExpiringTokenCache
+from services.powerbi_scheduler import PowerBIScheduler
+from services.authz import AuthContext, allowed_bits, get_authz_index_async
+from services.security import require_admin, get_current_user_optional
+from core.deps import get_auth_context
 
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/powerbi", tags=["powerbi"])
 
-async def get_app_token() -> str:
+# token de app (client credentials) compartilhado pelo processo
+app_token_cache = ExpiringTokenCache(refresh_margin=settings.PBI_APP_TOKEN_REFRESH_MARGIN_SECONDS)
+
+# toda chamada à API do Power BI passa pelo agendador (limite por workspace, 429, breaker)
+pbi_scheduler = PowerBIScheduler(
+    rate=settings.PBI_RATE_PER_WORKSPACE,
+    burst=settings.PBI_BURST_PER_WORKSPACE,
+    max_wait=settings.PBI_QUEUE_MAX_WAIT_SECONDS,
+    max_queue=settings.PBI_QUEUE_MAX_DEPTH,
+    retries=settings.PBI_RETRY_ATTEMPTS,
+    backoff_base=settings.PBI_RETRY_BACKOFF_BASE,
+    backoff_max=settings.PBI_RETRY_BACKOFF_MAX,
+    breaker_failures=settings.PBI_BREAKER_FAILURES,
+    breaker_reset=settings.PBI_BREAKER_RESET_SECONDS,
+)
+
+# embedUrl/datasetId por relatório; atualizados em background (ver refresh_report_metadata)
+report_metadata_cache = ExpiringTokenCache(refresh_margin=0)
+
+# embed tokens por (workspace_id, report_id, username, roles), com stale-while-revalidate
+embed_token_cache = ExpiringTokenCache(
+    refresh_margin=settings.PBI_EMBED_TOKEN_REFRESH_MARGIN_SECONDS,
+    stale_wait=settings.PBI_EMBED_TOKEN_STALE_WAIT_SECONDS,
+    max_entries=settings.PBI_EMBED_TOKEN_CACHE_MAX,
+)
+
+# tokens de lote (embed_info_batch) por (itens, username, roles): só o token, sem embed config
+multi_token_cache = ExpiringTokenCache(
+    refresh_margin=settings.PBI_EMBED_TOKEN_REFRESH_MARGIN_SECONDS,
+    stale_wait=settings.PBI_EMBED_TOKEN_STALE_WAIT_SECONDS,
+    max_entries=settings.PBI_EMBED_TOKEN_CACHE_MAX,
+)
+
+
+async def _fetch_app_token(_key=None) -> tuple[str, float]:
     data = {
         "grant_type": "client_credentials",
         "client_id": settings.AZURE_CLIENT_ID,
         "client_secret": settings.AZURE_CLIENT_SECRET,
         "scope": settings.PBI_SCOPE,
     }
-    async with httpx.AsyncClient(timeout=20) as client:                 #timout evita request pendurados
-        r = await client.post(AUTH_URL, data=data)                      #chama o endpoint do Azure AD (token).
-        if r.status_code != 200:
-            raise HTTPException(r.status_code, f"Auth error: {r.text}")
-        return r.json()["access_token"]                                 #retorna access_token do JSON (string JWT de app).
+    client = get_http_client()                                          #cliente compartilhado (keep-alive); timeouts em core/http.py
+    r = await client.post(AUTH_URL, data=data)                          #chama o endpoint do Azure AD (token).
+    if r.status_code != 200:
+        raise HTTPException(r.status_code, f"Auth error: {r.text}")
+    payload = r.json()
+    return payload["access_token"], float(payload.get("expires_in", 3600))  #access_token (JWT de app) + validade em segundos
+
+
+async def get_app_token() -> str:
+    return await app_token_cache.get("app", _fetch_app_token)
+
+
+def _expires_in(expiration: str | None, default: float = 3600) -> float:
+    # "expiration" do GenerateToken vem em ISO-8601 UTC, ex.: "2024-05-01T12:34:56Z"
+    if not expiration:
+        return default
+    try:
+        exp = datetime.fromisoformat(expiration.replace("Z", "+00:00"))
+    except ValueError:
+        return default
+    if exp.tzinfo is None:
+        exp = exp.replace(tzinfo=timezone.utc)
+    return max(0.0, (exp - datetime.now(timezone.utc)).total_seconds())
+
+
+async def _fetch_report_metadata(key: tuple) -> tuple[dict, float]:
+    _rep_id, workspace_id, report_id = key
+
+    app_token = await get_app_token()
+    headers = {"Authorization": f"Bearer {app_token}"}
+
+    report_url = f"{settings.PBI_API}/groups/{workspace_id}/reports/{report_id}"
+    r = await pbi_scheduler.request("GET", report_url, workspace_id=workspace_id, headers=headers)
+    if r.status_code != 200:
+        raise HTTPException(r.status_code, r.text)
+    report = r.json()
 
+    meta = {"embedUrl": report["embedUrl"], "datasetId": report["datasetId"]}
+    return meta, settings.PBI_REPORT_METADATA_TTL_SECONDS
 
 
+async def get_report_metadata(rep_id: str, workspace_id: str, report_id: str) -> dict:
+    """embedUrl/datasetId do relatório, em cache por linha de Report (+ ids do Power BI)."""
+    return await report_metadata_cache.get((rep_id, workspace_id, report_id), _fetch_report_metadata)
+
+
+def invalidate_report_metadata(rep_id: str) -> None:
+    report_metadata_cache.invalidate_where(lambda k: k[0] == rep_id)
+
+
+async def refresh_report_metadata() -> None:
+    """Tarefa periódica: atualiza em background os metadados já em cache."""
+    for key in report_metadata_cache.keys():
+        try:
+            await report_metadata_cache.refresh(key, _fetch_report_metadata)
+        except HTTPException as e:
+            if e.status_code == 404:
+                report_metadata_cache.invalidate(key)  # relatório removido no Power BI
+        except Exception as e:
+            logger.warning("Falha ao atualizar metadados do relatório %s: %s", key[0], e)
+
+
+async def _generate_embed_config(key: tuple, rep_id: str, meta: dict | None = None) -> tuple[dict, float]:
+    """Gera o embed token para (workspace, report, username, roles); embedUrl/datasetId vêm do cache."""
+    workspace_id, report_id, username, roles = key
+
+    if meta is None:
+        meta = await get_report_metadata(rep_id, workspace_id, report_id)
+    embed_url = meta["embedUrl"]
+    dataset_id = meta["datasetId"]
+
+    app_token = await get_app_token()
+    headers = {"Authorization": f"Bearer {app_token}"}
+
+    # Generate token
+    body = {"accessLevel": "View"}
+
+    if username:
+        body["identities"] = [{
+            "username": username,
+            "roles": list(roles),
+            "datasets": [dataset_id]
+        }]
+
+    gen_url = f"{settings.PBI_API}/groups/{workspace_id}/reports/{report_id}/GenerateToken"
+    r2 = await pbi_scheduler.request("POST", gen_url, workspace_id=workspace_id, headers=headers, json=body)
+
+    if r2.status_code != 200:
+        raise HTTPException(r2.status_code, r2.text)
+
+    generated = r2.json()
+
+    config = {
+        "groupId": workspace_id,
+        "reportId": report_id,
+        "datasetId": dataset_id,
+        "embedUrl": embed_url,
+        "accessToken": generated["token"],
+        "expiration": generated.get("expiration"),
+    }
+    return config, _expires_in(generated.get("expiration"))
+
+
+
+def _parse_roles(username: str | None, roles: str | None) -> tuple:
+    if not username:
+        return ()
+    return tuple(sorted(x.strip() for x in (roles or "").split(",") if x.strip()))
+
+
+async def _generate_multi_token(key: tuple) -> tuple[dict, float]:
+    """GenerateToken V2: um único token para vários relatórios/datasets (de um ou mais workspaces)."""
+    items, username, roles = key  # items: ((workspace_id, report_id, dataset_id), ...)
+
+    dataset_ids = sorted({ds for _, _, ds in items})
+    body = {
+        "reports": [{"id": rid} for _, rid, _ in items],
+        "datasets": [{"id": ds} for ds in dataset_ids],
+    }
+    if username:
+        body["identities"] = [{
+            "username": username,
+            "roles": list(roles),
+            "datasets": dataset_ids,
+        }]
+
+    app_token = await get_app_token()
+    headers = {"Authorization": f"Bearer {app_token}"}
+    workspaces = {ws for ws, _, _ in items}
+    r = await pbi_scheduler.request(
+        "POST", f"{settings.PBI_API}/GenerateToken",
+        workspace_id=next(iter(workspaces)) if len(workspaces) == 1 else None,
+        headers=headers, json=body,
+    )
+    if r.status_code != 200:
+        raise HTTPException(r.status_code, r.text)
+
+    generated = r.json()
+    token = {"accessToken": generated["token"], "expiration": generated.get("expiration")}
+    return token, _expires_in(generated.get("expiration"))
+
+
+def _embed_key(rep: Report, username: str | None = None, roles: str | None = None) -> tuple:
+    return (rep.workspace_id, rep.report_id, username or None, _parse_roles(username, roles))
+
+
+def _with_renew_handle(rep_id: str, key: tuple, config: dict) -> dict:
+    """Anexa ao embed config o handle p/ renovar só o token em /embed-token."""
+    workspace_id, report_id, username, roles = key
+    handle = make_embed_renewal_handle({
+        "rep": rep_id,
+        "ws": workspace_id,
+        "rid": report_id,
+        "ds": config["datasetId"],
+        "url": config["embedUrl"],
+        "u": username,
+        "r": list(roles),
+    })
+    return {**config, "renewHandle": handle}
+
+
+async def resolve_embed_config(rep: Report, wait: float = 0) -> dict | None:
+    """
+    Embed config p/ ir embutido na página do relatório (sem RLS, igual ao graficos.html).
+    wait=0: só usa o cache quente; wait>0: gera o token se preciso, até `wait` s
+    (a geração continua em background). None = a página busca via /embed-info.
+    """
+    if rep.powerbi_url and not rep.workspace_id:
+        return {"externalUrl": rep.powerbi_url}
+
+    key = _embed_key(rep)
+    config = embed_token_cache.peek(key)
+    if config is None and wait > 0:
+        try:
+            config = await asyncio.wait_for(
+                embed_token_cache.get(key, partial(_generate_embed_config, rep_id=rep.id)),
+                timeout=wait,
+            )
+        except Exception:
+            return None
+    return _with_renew_handle(rep.id, key, config) if config else None
+
 
 @router.get("/embed-info")
 async def embed_info(
     reportId: str = Query(...),
     username: Optional[str] = None,
     roles: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     rep = (
-        db.query(Report)
-          .filter(Report.id == reportId, Report.is_active == True)
-          .first()
-    )
+        await db.execute(
+            select(Report).where(Report.id == reportId, Report.is_active.is_(True))
+        )
+    ).scalars().first()
 
     if not rep:
         raise HTTPException(404, "Report not found")
@@ -53,50 +274,110 @@ async def embed_info(
     # -------------------------
     # CASO 2 — Interno (com token)
     # -------------------------
-    app_token = await get_app_token()
-    headers = {"Authorization": f"Bearer {app_token}"}
+    key = _embed_key(rep, username, roles)
+    config = await embed_token_cache.get(key, partial(_generate_embed_config, rep_id=rep.id))
+    return _with_renew_handle(rep.id, key, config)
 
-    report_url = f"{settings.PBI_API}/groups/{rep.workspace_id}/reports/{rep.report_id}"
 
-    async with httpx.AsyncClient(timeout=20) as client:
-        # GET report info
-        r = await client.get(report_url, headers=headers)
-        if r.status_code != 200:
-            raise HTTPException(r.status_code, r.text)
-        report = r.json()
+@router.post("/embed-token")
+async def renew_embed_token(payload: EmbedRenewIn, auth: AuthContext = Depends(get_auth_context)):
+    """
+    Renova só o embed token de um relatório já resolvido (dashboards abertos o dia todo):
+    sem GET do relatório no Power BI e, com os caches quentes, sem consulta ao banco.
+    A permissão é conferida a cada renovação (índice de autorização + Principal): quem foi
+    bloqueado, revogado ou perdeu o acesso ao relatório recebe 403 e o embed para de renovar.
+    A página agenda o setAccessToken pelo "expiration"; com o handle vencido (401), volta ao /embed-info.
+    """
+    try:
+        h = read_embed_renewal_handle(payload.handle, settings.PBI_EMBED_RENEW_HANDLE_MAX_AGE_SECONDS)
+    except Exception:
+        raise HTTPException(401, "Renewal handle inválido ou expirado")
+    if not auth.can_view(h["rep"]):
+        raise HTTPException(403, "You don't have permission to view this report")
 
-        embed_url = report["embedUrl"]
-        dataset_id = report["datasetId"]
-
-        # Generate token
-        body = {"accessLevel": "View"}
+    key = (h["ws"], h["rid"], h.get("u"), tuple(h.get("r") or ()))
+    # metadados atuais se estiverem em cache; senão os do handle (evita o GET do relatório)
+    meta = report_metadata_cache.peek((h["rep"], h["ws"], h["rid"])) or {"embedUrl": h["url"], "datasetId": h["ds"]}
+    config = await embed_token_cache.get(key, partial(_generate_embed_config, rep_id=h["rep"], meta=meta))
+    return {
+        "accessToken": config["accessToken"],
+        "expiration": config["expiration"],
+        "expiresIn": int(_expires_in(config["expiration"])),
+    }
 
-        if username:
-            roles_list = [x.strip() for x in (roles or "").split(",") if x.strip()]
-            body["identities"] = [{
-                "username": username,
-                "roles": roles_list,
-                "datasets": [dataset_id]
-            }]
 
-        gen_url = f"{settings.PBI_API}/groups/{rep.workspace_id}/reports/{rep.report_id}/GenerateToken"
-        r2 = await client.post(gen_url, headers=headers, json=body)
+@router.post("/embed-info/batch")
+async def embed_info_batch(
+    payload: EmbedBatchIn,
+    db: AsyncSession = Depends(get_async_db),
+    user: User | None = Depends(get_current_user_optional),
+):
+    """
+    Embed config de vários relatórios com UM embed token (GenerateToken V2).
+    Mesmas regras de visibilidade do /report/{id}; ids não visíveis voltam em "errors".
+    """
+    requested = list(dict.fromkeys(payload.report_ids))  # sem duplicados, mantendo a ordem
+    idx = await get_authz_index_async(db)
+    allowed = allowed_bits(idx, user)
+    visible = [rid for rid in requested if idx.has(allowed, rid)]
+    reps = (
+        await db.execute(
+            select(Report).where(Report.id.in_(visible), Report.is_active.is_(True))
+        )
+    ).scalars().all() if visible else []
+    by_id = {r.id: r for r in reps}
 
-        if r2.status_code != 200:
-            raise HTTPException(r2.status_code, r2.text)
+    out: dict[str, dict] = {}
+    errors = {rid: "Report not found" for rid in requested if rid not in by_id}
 
-        token = r2.json()["token"]
+    internal = []
+    for rid in requested:
+        rep = by_id.get(rid)
+        if rep is None:
+            continue
+        if rep.powerbi_url and not rep.workspace_id:
+            out[rid] = {"externalUrl": rep.powerbi_url}
+        else:
+            internal.append(rep)
 
-    return {
-        "groupId": rep.workspace_id,
-        "reportId": rep.report_id,
-        "datasetId": dataset_id,
-        "embedUrl": embed_url,
-        "accessToken": token
-    }
+    if internal:
+        metas = await asyncio.gather(
+            *(get_report_metadata(rep.id, rep.workspace_id, rep.report_id) for rep in internal),
+            return_exceptions=True,
+        )
+        resolved = []
+        for rep, meta in zip(internal, metas):
+            if isinstance(meta, Exception):
+                errors[rep.id] = getattr(meta, "detail", None) or str(meta)
+            else:
+                resolved.append((rep, meta))
 
+        if resolved:
+            # agrupa por workspace e dataset: uma chamada GenerateToken para o lote todo
+            items = tuple(sorted({(rep.workspace_id, rep.report_id, meta["datasetId"]) for rep, meta in resolved}))
+            key = (items, payload.username or None, _parse_roles(payload.username, payload.roles))
+            token = await multi_token_cache.get(key, _generate_multi_token)
 
+            for rep, meta in resolved:
+                out[rep.id] = {
+                    "groupId": rep.workspace_id,
+                    "reportId": rep.report_id,
+                    "datasetId": meta["datasetId"],
+                    "embedUrl": meta["embedUrl"],
+                    "accessToken": token["accessToken"],
+                    "expiration": token["expiration"],
+                }
 
- 
+    return {"reports": out, "errors": errors}
 
 
+@router.get("/stats", include_in_schema=False)
+def powerbi_stats(_u: User = Depends(require_admin)):
+    return {
+        "app_token": app_token_cache.stats(),
+        "embed_token": embed_token_cache.stats(),
+        "multi_token": multi_token_cache.stats(),
+        "report_metadata": report_metadata_cache.stats(),
+        "http_pool": http_pool_stats(),
+        "scheduler": pbi_scheduler.stats(),
+    }
@@ -1,18 +1,23 @@
 from fastapi import APIRouter, Depends, Request, HTTPException, status
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
+from starlette.concurrency import run_in_threadpool
+from db import get_async_db
 from models.models import Group, Report, ReportAccessLevel, AccessLevel
 from models.models_rbac import User
 from services.security import require_admin
-from core.templates import templates
+from core.templates import render
 from schemas.schemas_rbac import ReportGroupCreate, ReportSubgroupCreate
 from schemas.schemas import ReportOut, ReportAccessLevelEnum
 import re
 import unicodedata
 from core.deps import with_menu
 from routers.media_uploads import MEDIA_DIR, MEDIA_URL
+from routers.powerbi import invalidate_report_metadata
+from services.authz import invalidate_authz
+from services.catalog import get_catalog, rebuild_catalog
+from services.group_closure import add_group_closure
 
 router = APIRouter(prefix="/register", tags=["register"], dependencies=[Depends(with_menu)])
 
@@ -25,45 +30,21 @@ def normalize_words(value: str) -> str:
     return value
 
 @router.get("/report-registration-group", response_class=HTMLResponse, include_in_schema=False)
-def report_registration_group(
+async def report_registration_group(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
-    # pega todos os grupos (1 query)
-    groups = (
-        db.query(Group.id, Group.name, Group.parent_id)
-          .filter(Group.is_active.is_(True))
-          .order_by(Group.name.asc())
-          .all()
-    )
-    gmap = {}
-    for g in groups:
-        gmap[g.id] = {"name": g.name, "parent_id": g.parent_id}
-
-    def build_path(group_id: str) -> str:
-        parts = []
-        seen = set()
-        gid = group_id
-        # sobe até a raiz (protege contra ciclos)
-        while gid and gid in gmap and gid not in seen:
-            parts.append(gmap[gid]["name"])
-            seen.add(gid)
-            gid = gmap[gid]["parent_id"]
-        return " >> ".join(reversed(parts)) if parts else "-"
-
-    # pega reports ativos (1 query)
-    reports = db.query(Report).filter(Report.is_active.is_(True)).all()
+    # grupos/relatórios/caminhos vêm do snapshot do catálogo
+    cat = await get_catalog(db)
+    groups = cat.active_groups
 
     # prepara linhas para o template
-    report_rows = []
-    for r in reports:
-        row = {
-            "r": r,
-            "group_path": build_path(r.group_id)
-        }
-        report_rows.append(row)
-        
+    report_rows = [
+        {"r": r, "group_path": cat.path_label(r.group_id)}
+        for r in cat.reports.values()
+    ]
+
     ctx = {
         "request": request,
         "user": user,
@@ -71,19 +52,19 @@ def report_registration_group(
         "report_rows": report_rows
     }
 
-    return templates.TemplateResponse("cadastro-paineis.html", ctx)
+    return await render("cadastro-paineis.html", ctx)
 
 
 @router.post("/report-groups", status_code=status.HTTP_201_CREATED)
-def create_report_group(
+async def create_report_group(
     payload: ReportGroupCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
     s_id = normalize_words(payload.name)
 
     # checa duplicidade por id (slug) e por nome (case-insensitive)
-    has_id = db.query(Group).filter(Group.id == s_id).first()
+    has_id = await db.get(Group, s_id)
     if has_id:
         raise HTTPException(status_code=409, detail="Já existe um grupo com este nome.")
     
@@ -95,34 +76,34 @@ def create_report_group(
         description=payload.description,
     )
     db.add(grp)
-    db.commit()
-    db.refresh(grp)
+    await add_group_closure(db, grp.id, None)
+    await db.commit()
+    await rebuild_catalog(db)
     return {"message": "Grupo criado com sucesso!", "id": grp.id}
 
 @router.post("/report-subgroups", status_code=status.HTTP_201_CREATED)
-def create_report_subgroup(
+async def create_report_subgroup(
     payload: ReportSubgroupCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
-    parent = db.query(Group).filter(Group.id == payload.parent_id).first()
+    parent = await db.get(Group, payload.parent_id)
     if not parent:
         raise HTTPException(status_code=404, detail="Grupo pai não encontrado.")
 
     s_id = normalize_words(payload.name)
 
-    has_id = db.query(Group).filter(Group.id == s_id).first()
+    has_id = await db.get(Group, s_id)
     if has_id:
         raise HTTPException(status_code=409, detail="Já existe um subgrupo com este nome.")
 
-    has_name_same_parent = (
-        db.query(Group)
-        .filter(
+    has_name_same_parent = (await db.execute(
+        select(Group.id)
+        .where(
             func.lower(Group.name) == func.lower(payload.name),
             Group.parent_id == payload.parent_id,
         )
-        .first()
-    )
+    )).first()
     if has_name_same_parent:
         raise HTTPException(status_code=409, detail="Já existe um subgrupo com este nome nesse grupo pai.")
 
@@ -134,20 +115,21 @@ def create_report_subgroup(
         description=payload.description
     )
     db.add(sub)
-    db.commit()
-    db.refresh(sub)
+    await add_group_closure(db, sub.id, payload.parent_id)
+    await db.commit()
+    await rebuild_catalog(db)
     return {"message": "Subgrupo criado com sucesso!", "id": sub.id}
 
 
 @router.post("/reports", response_model=ReportOut)
-def create_report(payload: ReportOut, db: Session = Depends(get_db)):
+async def create_report(payload: ReportOut, db: AsyncSession = Depends(get_async_db)):
     has_url = bool(payload.powerbi_url)
     has_ids = bool(payload.workspace_id and payload.report_id)
 
     # define o id (slug)
     if not payload.id:
         s_id = normalize_words(payload.name)
-        exists = db.query(Report).filter(Report.id == s_id).first()
+        exists = await db.get(Report, s_id)
         if exists:
             raise HTTPException(status_code=409, detail="Já existe um powerbi com este Nome.")
     else:
@@ -173,7 +155,7 @@ def create_report(payload: ReportOut, db: Session = Depends(get_db)):
         is_public=payload.is_public,
     )
     db.add(report)
-    db.flush()  # garante report.id disponível para as FKs
+    await db.flush()  # garante report.id disponível para as FKs
 
     # popula N níveis de acesso
     # payload.access_levels é uma lista de ReportAccessLevelEnum
@@ -189,8 +171,10 @@ def create_report(payload: ReportOut, db: Session = Depends(get_db)):
             level=AccessLevel(lvl_value)  # converte para Enum do modelo
         ))
 
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    invalidate_authz()  # novo relatório ativo (público ou não)
+    await db.refresh(report, ["access_levels"])  # relação carregada aqui: AsyncSession não faz lazy load
+    await rebuild_catalog(db)
 
     # monta saída com os níveis já persistidos
     out_levels = [
@@ -214,13 +198,13 @@ def create_report(payload: ReportOut, db: Session = Depends(get_db)):
 
 
 @router.put("/reports/{report_id}", response_model=ReportOut)
-def update_report(
+async def update_report(
     report_id: str,
     payload: ReportOut,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
-    report = db.query(Report).filter(Report.id == report_id).first()
+    report = await db.get(Report, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Painel não encontrado.")
     
@@ -243,6 +227,7 @@ def update_report(
     )
 
     old_image_url = report.image_url
+    old_pbi_ids = (report.workspace_id, report.report_id)
 
     report.name = payload.name
     report.group_id = payload.group_id
@@ -260,9 +245,9 @@ def update_report(
         report.powerbi_url = None
 
     # limpa níveis antigos
-    db.query(ReportAccessLevel).filter(
+    await db.execute(delete(ReportAccessLevel).where(
         ReportAccessLevel.report_id == report.id
-    ).delete()
+    ))
 
     # recria níveis conforme o payload
     for lvl in payload.access_levels:
@@ -276,8 +261,14 @@ def update_report(
             level=AccessLevel(lvl_value),
         ))
 
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    invalidate_authz()  # is_public/group_id podem ter mudado
+    await db.refresh(report, ["access_levels"])
+    await rebuild_catalog(db)
+
+    # embedUrl/datasetId em cache ficam inválidos se o relatório apontar p/ outro do Power BI
+    if old_pbi_ids != (report.workspace_id, report.report_id):
+        invalidate_report_metadata(report.id)
 
     out_levels = [
         ReportAccessLevelEnum(ra.level.value)
@@ -291,8 +282,7 @@ def update_report(
             if old_image_url.startswith(prefix):
                 filename = old_image_url[len(prefix):]  # "abcd1234.jpg"
                 old_path = MEDIA_DIR / filename
-                if old_path.is_file():
-                    old_path.unlink()
+                await run_in_threadpool(old_path.unlink, missing_ok=True)  # NFS em produção: bloqueante
         except Exception as e:
             # aqui pode só logar, pra não quebrar a requisição
             print(f"Falha ao remover imagem antiga {old_image_url}: {e}")
@@ -1,55 +1,46 @@
 # routers/index.py (ou outro router “páginas”)
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from db import get_db
-from core.templates import templates
+from db import get_async_db
+from core.settings import settings
+from core.templates import render
 from models.models import Report
-from models.models_rbac import User, UserGroupMember, GroupReportPermission
+from models.models_rbac import User
+from services.authz import AuthContext
 from services.security import get_current_user_optional
-from core.deps import with_menu
+from core.deps import get_auth_context, with_menu
+from routers.powerbi import resolve_embed_config
 
 router = APIRouter(dependencies=[Depends(with_menu)])
 
 @router.get("/report/{report_id}", response_class=HTMLResponse)
-def report_view(
+async def report_view(
     request: Request,
     report_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Optional[User] = Depends(get_current_user_optional),
+    auth: AuthContext = Depends(get_auth_context),
 ):
-    # Base: precisa estar ativo e existir
-    q = db.query(Report).filter(
-        Report.id == report_id,
-        Report.is_active == True,
-    )
-
-    # Admin vê tudo
-    if user and getattr(user, "is_admin", False):
-        rep = q.first()
-        if not rep:
-            raise HTTPException(404, "Report not found")
-    # Usuário comum: público OU permitido pelos grupos dele
-    elif user:
-        allowed_subq = (
-            db.query(GroupReportPermission.report_id)
-              .join(UserGroupMember, UserGroupMember.group_id == GroupReportPermission.group_id)
-              .filter(UserGroupMember.user_id == user.id)
-        )
-        rep = (
-            q.filter(or_(Report.is_public == True, Report.id.in_(allowed_subq)))
-             .first()
+    rep = (
+        await db.execute(
+            select(Report).where(Report.id == report_id, Report.is_active.is_(True))
         )
-        if not rep:
-            raise HTTPException(403, "You don't have permission to view this report")
-    # Anônimo: só públicos
-    else:
-        rep = q.filter(Report.is_public == True).first()
-        if not rep:
-            raise HTTPException(403, "You don't have permission to view this report")
+    ).scalars().first() if auth.can_view(report_id) else None  # bit do relatório no bitmap do usuário
+    if not rep:
+        # admin vê tudo: se não achou, não existe
+        if auth.is_admin:
+            raise HTTPException(404, "Report not found")
+        raise HTTPException(403, "You don't have permission to view this report")
+
+    # embed config já na página: o iframe começa a carregar sem o round trip ao /embed-info
+    embed = await resolve_embed_config(rep, settings.PBI_INLINE_EMBED_WAIT_SECONDS) if settings.PBI_INLINE_EMBED else None
 
-    ctx = {"request": request, "user": user, "report": rep}
-    return templates.TemplateResponse("graficos.html", ctx)
+    ctx = {"request": request, "user": user, "report": rep, "embed": embed}
+    resp = await render("graficos.html", ctx)
+    if embed and "accessToken" in embed:
+        resp.headers["Cache-Control"] = "no-store"  # página carrega o embed token
+    return resp
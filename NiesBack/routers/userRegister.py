@@ -1,89 +1,71 @@
 
-from fastapi import APIRouter, Depends, Request,HTTPException, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Depends, Request,HTTPException, Form, UploadFile, File
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from models.models_rbac import User
 from services.security import require_admin
-from core.templates import templates
-from sqlalchemy.orm import Session
-from db import get_db
+from core.templates import render
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from db import get_async_db
 from models.models_rbac import User, UserGroup, UserGroupMember, UserStatus
 from datetime import date
 from typing import List, Optional
 from core.deps import with_menu
 from core.settings import settings
-from core.tokens import make_invite_token, read_invite_token
-from core.email import send_email
-from sqlalchemy import select, or_
+from core.tokens import make_invite_token, make_invite_tokens, read_invite_token
+from core.email import send_email, send_emails
+from sqlalchemy import delete, func, select, or_
 from starlette import status as http_status
 from services.password_reset import create_password_reset
+from services.principal import invalidate_principal
 from schemas.schemas_rbac import UserCreate
+from services.user_import import (
+    read_rows, validate_rows, invite_payload, invite_email, TEMPLATE_HEADER, TEMPLATE_EXAMPLE,
+)
+import csv, io
 
 router = APIRouter(prefix="/register", tags=["register"], dependencies=[Depends(with_menu)])
 
 
 @router.get("/user-register", response_class=HTMLResponse, include_in_schema=False)
-def user_registration(request: Request,
-    db: Session = Depends(get_db),
+async def user_registration(request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
     
-    user_groups = db.query(UserGroup).order_by(UserGroup.name.asc()).all()
+    user_groups = (await db.execute(select(UserGroup).order_by(UserGroup.name.asc()))).scalars().all()
     ctx= { "request": request,
             "user": user,
             "user_groups":user_groups
           }
 
-    return templates.TemplateResponse("cadastro-usuarios.html", ctx)
+    return await render("cadastro-usuarios.html", ctx)
 
 @router.post("/user-register", name="post_user_registration")
 async def post_user_registration(
     user_in: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # user: User = Depends(require_admin)  # se quiser exigir admin
 ):
     # 1) checagem duplicidade
     existing = (
-        db.query(User)
-          .filter(or_(User.email == user_in.email, User.cpf == user_in.cpf))
-          .first()
-    )
+        await db.execute(
+            select(User).where(or_(User.email == user_in.email, User.cpf == user_in.cpf))
+        )
+    ).scalars().first()
     if existing:
         if existing.email == user_in.email:
             raise HTTPException(status_code=400, detail="E-mail já foi cadastrado.")
         raise HTTPException(status_code=400, detail="CPF já foi cadastrado.")
 
-    # 2) monta payload do convite (datas já são date -> serialize para iso)
-    payload = {
-        "name": user_in.name.strip(),
-        "cpf": user_in.cpf.strip(),
-        "email": user_in.email.strip().lower(),
-        "phone": (user_in.phone or "").strip() or None,
-        "status": user_in.status,  # "approved" | "pending"
-        "valid_from": user_in.valid_from.isoformat() if user_in.valid_from else None, #isoformat transforma data em (YYYY-MM-DD)
-        "valid_to": user_in.valid_to.isoformat() if user_in.valid_to else None,
-        "group_ids": user_in.group_ids or [],
-    }
-    token = make_invite_token(payload)
+    # 2) monta payload do convite
+    token = make_invite_token(invite_payload(user_in))
 
     confirm_url = f"{settings.PUBLIC_BASE_URL}/register/confirm?token={token}"
+    subject, text, html = invite_email(user_in.name, confirm_url)
 
-    subject = "Confirmação de acesso"
-    text = (
-        f"Olá, {user_in.name},\n\n"
-        "Um administrador criou um acesso para você.\n"
-        "Clique no link abaixo para confirmar e ativar seu usuário:\n\n"
-        f"{confirm_url}\n\n"
-        "Se você não solicitou, ignore este e-mail."
-    )
-    html = f"""
-    <p>Olá, <strong>{user_in.name}</strong>,</p>
-    <p>Um administrador criou um acesso para você.</p>
-    <p>Clique para confirmar e ativar seu usuário:</p>
-    <p><a href="{confirm_url}">Confirmar meu acesso</a></p>
-    <p>Se você não solicitou, ignore este e-mail.</p>
-    """
-
-    send_email(to=user_in.email, subject=subject, body_text=text, body_html=html)
+    # SMTP é bloqueante: roda fora do event loop
+    await run_in_threadpool(send_email, to=user_in.email, subject=subject, body_text=text, body_html=html)
 
     return JSONResponse(
     {
@@ -94,8 +76,82 @@ async def post_user_registration(
 )
 
 
+@router.get("/user-import", response_class=HTMLResponse, include_in_schema=False)
+async def user_import_page(request: Request, user: User = Depends(require_admin)):
+    ctx = {"request": request, "user": user, "max_rows": settings.USER_IMPORT_MAX_ROWS}
+    return await render("importar-usuarios.html", ctx)
+
+
+@router.get("/user-import/modelo.csv", include_in_schema=False)
+async def user_import_template(_u: User = Depends(require_admin)):
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=";")
+    w.writerow(TEMPLATE_HEADER)
+    w.writerow(TEMPLATE_EXAMPLE)
+    return Response(
+        content="\ufeff" + buf.getvalue(),  # BOM: Excel abre em UTF-8
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="modelo-importacao-usuarios.csv"'},
+    )
+
+
+@router.post("/user-import", name="post_user_import")
+async def post_user_import(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    _u: User = Depends(require_admin),
+):
+    """
+    Importa usuários de um CSV/XLSX e envia os convites (mesmo fluxo do /user-register).
+    Retorna um relatório por linha: sent | skipped (já cadastrado/repetido) | error.
+    """
+    content = await file.read()
+    try:
+        rows = await run_in_threadpool(read_rows, file.filename, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {settings.USER_IMPORT_MAX_ROWS} linhas por arquivo.")
+
+    # 1) duplicidade e grupos: consultas em lote, não uma por linha
+    emails = {str(r.get("email") or "").strip().lower() for _, r in rows} - {""}
+    cpfs = {str(r.get("cpf") or "").strip() for _, r in rows} - {""}
+    # e-mails antigos podem ter sido gravados com maiúsculas: compara sem caixa
+    lower_email = func.lower(User.email)
+    existing_emails = set((await db.execute(select(lower_email).where(lower_email.in_(emails)))).scalars()) if emails else set()
+    existing_cpfs = set((await db.execute(select(User.cpf).where(User.cpf.in_(cpfs)))).scalars()) if cpfs else set()
+    # nomes e ids em mapas separados: um grupo de nome "12" não pode virar o grupo de id 12
+    group_ids_by_name: dict[str, int] = {}
+    group_ids: set[int] = set()
+    for gid, name in (await db.execute(select(UserGroup.id, UserGroup.name))).all():
+        group_ids_by_name[name.strip().lower()] = gid
+        group_ids.add(gid)
+
+    valid, report = validate_rows(rows, existing_emails, existing_cpfs, group_ids_by_name, group_ids)
+
+    # 2) tokens em lote + envio concorrente
+    tokens = make_invite_tokens([invite_payload(u) for _, u in valid])
+    messages = []
+    for (_, u), token in zip(valid, tokens):
+        subject, text, html = invite_email(u.name, f"{settings.PUBLIC_BASE_URL}/register/confirm?token={token}")
+        messages.append((u.email, subject, text, html))
+    errors = await run_in_threadpool(send_emails, messages)
+
+    for (n, u), err in zip(valid, errors):
+        if err:
+            report.append({"row": n, "email": u.email, "status": "error", "detail": f"Falha no envio: {err}"})
+        else:
+            report.append({"row": n, "email": u.email, "status": "sent", "detail": None})
+    report.sort(key=lambda r: r["row"])
+
+    totals = {"total": len(rows), "sent": 0, "skipped": 0, "error": 0}
+    for r in report:
+        totals[r["status"]] += 1
+    return {**totals, "rows": report}
+
+
 @router.get("/confirm", response_class=HTMLResponse)
-def confirm_invite(request: Request, token: str, db: Session = Depends(get_db)):
+async def confirm_invite(request: Request, token: str, db: AsyncSession = Depends(get_async_db)):
     # Valida token
     try:
         data = read_invite_token(token, max_age_seconds=settings.INVITE_EXPIRES_SECONDS)
@@ -113,9 +169,9 @@ def confirm_invite(request: Request, token: str, db: Session = Depends(get_db)):
     group_ids = data.get("group_ids", [])
 
     # Já existe usuário?
-    existing: User | None = db.execute(
+    existing: User | None = (await db.execute(
         select(User).where(User.email == email)
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
 
     if existing:
         # Atualiza campos e status, se fizer sentido
@@ -143,24 +199,25 @@ def confirm_invite(request: Request, token: str, db: Session = Depends(get_db)):
             password_hash="",  #forçar setar a senha no primeiro acesso.
         )
         db.add(user_obj)
-        db.flush()  # para ter user_obj.id
+        await db.flush()  # para ter user_obj.id
 
     # Sincroniza grupos
     if group_ids:
         # limpa memberships atuais e adiciona os do convite
-        db.query(UserGroupMember).filter(UserGroupMember.user_id == user_obj.id).delete()
+        await db.execute(delete(UserGroupMember).where(UserGroupMember.user_id == user_obj.id))
         # valida IDs existentes
-        groups = db.execute(select(UserGroup).where(UserGroup.id.in_(group_ids))).scalars().all()
+        groups = (await db.execute(select(UserGroup).where(UserGroup.id.in_(group_ids)))).scalars().all()
         for g in groups:
             db.add(UserGroupMember(user_id=user_obj.id, group_id=g.id))
 
-    db.commit()
+    await db.commit()
+    invalidate_principal(user_obj.id)  # status/validade/grupos podem ter mudado
 
-    reset_id, raw = create_password_reset(db, user_obj)
+    reset_id, raw = await db.run_sync(create_password_reset, user_obj)
     setpwd_url = f"{settings.PUBLIC_BASE_URL}/auth/set-password?rid={reset_id}&token={raw}"
 
     # Redireciona para página de sucesso / login
-    return templates.TemplateResponse(
+    return await render(
     "mensagem.html",
     {
         "request": request,
@@ -4,26 +4,27 @@ from starlette import status
 from fastapi.responses import HTMLResponse
 from models.models_rbac import User
 from services.security import require_admin
-from core.templates import templates
-from sqlalchemy.orm import Session
-from db import get_db
+from core.templates import render
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models.models_rbac import User, UserGroup, GroupReportPermission
 from models.models import Report
 from schemas.schemas_rbac import UserGroupCreate, UserGroupOut
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, select
 from core.deps import with_menu
+from services.authz import invalidate_authz
 
 
 router = APIRouter(prefix="/register", tags=["register"], dependencies=[Depends(with_menu)])
 
 @router.get("/user-registration-group", response_class=HTMLResponse, include_in_schema=False)
-def user_registration_group(
+async def user_registration_group(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(require_admin),
 ):
-    groups = (
-        db.query(
+    groups = (await db.execute(
+        select(
             UserGroup.id,
             UserGroup.name,
             func.count(distinct(GroupReportPermission.report_id)).label("total_reports"),
@@ -32,19 +33,17 @@ def user_registration_group(
         .outerjoin(Report, (Report.id == GroupReportPermission.report_id) & (Report.is_active.is_(True)))
         .group_by(UserGroup.id, UserGroup.name)
         .order_by(UserGroup.name.asc())
-        .all()
-    )
+    )).all()
 
-    reports = (
-        db.query(Report)
-          .filter(
+    reports = (await db.execute(
+        select(Report)
+          .where(
               Report.is_active == True
           )
           .order_by(Report.sort_order.is_(None),
                     Report.sort_order.asc(),
                     Report.name.asc())
-          .all()
-    )
+    )).scalars().all()
 
     
 
@@ -54,18 +53,18 @@ def user_registration_group(
         "groups": groups,
         "reports": reports
     }
-    return templates.TemplateResponse("cadastro-grupos.html", ctx)
+    return await render("cadastro-grupos.html", ctx)
 
 
 
 @router.post("/user-groups", response_model=UserGroupOut, status_code=status.HTTP_201_CREATED)
-def create_user_group(
+async def create_user_group(
     payload: UserGroupCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _u: User = Depends(require_admin),
 ):
     # evita duplicado por nome
-    exists = db.query(UserGroup).filter(UserGroup.name == payload.name).first()
+    exists = (await db.execute(select(UserGroup).where(UserGroup.name == payload.name))).scalars().first()
     if exists:
         raise HTTPException(status_code=409, detail="Já existe um grupo com esse nome.")
     
@@ -75,11 +74,10 @@ def create_user_group(
     # valida reports
     elif payload.report_ids:
     # 1) Busca somente os IDs existentes no banco
-        resultados = (
-        db.query(Report.id)
-          .filter(Report.id.in_(payload.report_ids))
-          .all()
-    )
+        resultados = (await db.execute(
+        select(Report.id)
+          .where(Report.id.in_(payload.report_ids))
+    )).all()
 
     # 2) Monta um conjunto com os IDs encontrados
     found = set()
@@ -105,13 +103,14 @@ def create_user_group(
         description=(payload.description or "").strip(),
     )
     db.add(grp)
-    db.flush()
+    await db.flush()
 
     for rep_id in payload.report_ids:
         db.add(GroupReportPermission(group_id=grp.id, report_id=rep_id))
 
-    db.commit()
-    db.refresh(grp)
+    await db.commit()
+    invalidate_authz()
+    await db.refresh(grp)
 
     return UserGroupOut(
         name=grp.name,
@@ -121,12 +120,11 @@ def create_user_group(
 
 
 @router.get("/user-groups/{group_id}/report-ids")
-def list_report_ids_for_group(group_id: str, db: Session = Depends(get_db), _u: User = Depends(require_admin)):
-    rows = (
-        db.query(GroupReportPermission.report_id)
-          .filter(GroupReportPermission.group_id == group_id)
-          .all()
-    )
+async def list_report_ids_for_group(group_id: int, db: AsyncSession = Depends(get_async_db), _u: User = Depends(require_admin)):
+    rows = (await db.execute(
+        select(GroupReportPermission.report_id)
+          .where(GroupReportPermission.group_id == group_id)
+    )).all()
     # rows pode vir como [(id,), (id,)...]
     ids = [r[0] if isinstance(r, tuple) else getattr(r, "report_id", r) for r in rows]
     return ids
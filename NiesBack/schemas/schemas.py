@@ -37,3 +37,12 @@ class   ReportOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+class EmbedBatchIn(BaseModel):
+    report_ids: List[str] = Field(min_length=1, max_length=50)
+    username: str | None = None
+    roles: str | None = None   # separados por vírgula, como no /embed-info
+
+
+class EmbedRenewIn(BaseModel):
+    handle: str = Field(min_length=1, max_length=2048)
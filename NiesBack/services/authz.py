@@ -0,0 +1,214 @@
+"""
+Índice de autorização: quais relatórios cada grupo de usuários libera.
+
+Antes cada página (home, grupo, relatório, menu) montava de novo o subquery
+"público OU em GroupReportPermission via UserGroupMember", 2-3 vezes por request.
+Aqui o índice é carregado de uma vez (relatórios ativos + permissões por grupo).
+
+Representação em bitmap (int do Python): cada relatório ativo recebe uma posição
+densa; permissões de cada UserGroup, públicos, ativos e relatórios de cada grupo do
+catálogo viram um int. A visão do usuário é o OR dos bitmaps dos grupos dele
+(Principal.group_ids), e menu/listagem/visibilidade são AND/OR entre ints — ver
+bench/bench_authz_bitmap.py (50k relatórios × 5k grupos).
+
+Invalidação:
+- permissões/grupos/relatórios mudaram → invalidate_authz() (admin, cadastro de grupos/relatórios);
+- membros de um grupo mudaram → invalidate_principal(user_id): os grupos vêm do Principal;
+- outros workers enxergam a mudança em até AUTHZ_INDEX_TTL_SECONDS.
+"""
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.settings import settings
+from models.models import Report
+from models.models_rbac import GroupReportPermission, User
+
+# byte -> posições dos bits ligados (decodificação de bitmap byte a byte)
+_BYTE_BITS = tuple(tuple(i for i in range(8) if b >> i & 1) for b in range(256))
+
+
+def _bitmap(positions) -> int:
+    # monta o int de uma vez (OR bit a bit copiaria o int inteiro a cada relatório)
+    positions = list(positions)
+    if not positions:
+        return 0
+    buf = bytearray(max(positions) // 8 + 1)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class AuthzIndex:
+    """Snapshot imutável em bitmaps: ativos, públicos, por grupo de usuários e por grupo do catálogo."""
+    __slots__ = ("ids", "pos", "active", "public", "by_group", "by_catalog_group", "report_group", "_unions")
+
+    def __init__(
+        self,
+        ids: tuple[str, ...],
+        public: int,
+        by_group: dict[int, int],
+        report_group: dict[str, str],
+    ):
+        self.ids = ids                                   # posição -> Report.id
+        self.pos = {rid: i for i, rid in enumerate(ids)}  # Report.id -> posição
+        self.active = (1 << len(ids)) - 1
+        self.public = public
+        self.by_group = by_group                         # UserGroup.id -> bitmap
+        self.report_group = report_group                 # Report.id -> Group.id (catálogo)
+        by_catalog: dict[str, list[int]] = {}
+        for rid, gid in report_group.items():
+            by_catalog.setdefault(gid, []).append(self.pos[rid])
+        self.by_catalog_group = {g: _bitmap(p) for g, p in by_catalog.items()}  # Group.id -> bitmap dos relatórios dele
+        self._unions: dict[frozenset[int], int] = {}     # group_ids -> OR (memo)
+
+    def union(self, group_ids: frozenset[int]) -> int:
+        """Bitmap dos relatórios liberados pelos grupos (sem os públicos)."""
+        bits = self._unions.get(group_ids)
+        if bits is None:
+            bits = 0
+            for g in group_ids:
+                bits |= self.by_group.get(g, 0)
+            self._unions[group_ids] = bits
+        return bits
+
+    def has(self, bits: int, report_id: str) -> bool:
+        i = self.pos.get(report_id)
+        return i is not None and bits >> i & 1 == 1
+
+    def decode(self, bits: int) -> frozenset[str]:
+        """Bitmap -> conjunto de Report.id (pula bytes zerados)."""
+        if not bits:
+            return frozenset()
+        ids, out = self.ids, []
+        for n, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+            if byte:
+                base = n * 8
+                out.extend(ids[base + i] for i in _BYTE_BITS[byte])
+        return frozenset(out)
+
+    def catalog_groups(self, bits: int) -> frozenset[str]:
+        """Grupos do catálogo com ao menos 1 relatório no bitmap."""
+        return frozenset(g for g, b in self.by_catalog_group.items() if b & bits)
+
+
+_state: dict = {"index": None, "expires": 0.0, "gen": 0}
+
+
+def build_index(reports, permissions) -> AuthzIndex:
+    """reports: (Report.id, Report.group_id, is_public) dos ativos; permissions: (UserGroup.id, Report.id)."""
+    ids, public, report_group = [], [], {}
+    for rid, gid, is_public in reports:
+        if is_public:
+            public.append(len(ids))
+        report_group[rid] = gid
+        ids.append(rid)
+
+    pos = {rid: i for i, rid in enumerate(ids)}
+    by_group: dict[int, list[int]] = {}
+    for gid, rid in permissions:
+        i = pos.get(rid)
+        if i is not None:  # só relatórios ativos
+            by_group.setdefault(gid, []).append(i)
+
+    return AuthzIndex(
+        ids=tuple(ids),
+        public=_bitmap(public),
+        by_group={g: _bitmap(p) for g, p in by_group.items()},
+        report_group=report_group,
+    )
+
+
+def _load(db: Session) -> AuthzIndex:
+    return build_index(
+        db.execute(
+            select(Report.id, Report.group_id, Report.is_public)
+            .where(Report.is_active.is_(True))
+            .order_by(Report.id)
+        ),
+        db.execute(select(GroupReportPermission.group_id, GroupReportPermission.report_id)),
+    )
+
+
+def _cached() -> AuthzIndex | None:
+    idx = _state["index"]
+    return idx if idx is not None and time.monotonic() < _state["expires"] else None
+
+
+def _store(idx: AuthzIndex, gen: int) -> AuthzIndex:
+    # invalidado durante a carga: usa o resultado neste request, mas não guarda
+    if gen == _state["gen"]:
+        _state["index"] = idx
+        _state["expires"] = time.monotonic() + settings.AUTHZ_INDEX_TTL_SECONDS
+    return idx
+
+
+async def get_authz_index_async(db: AsyncSession) -> AuthzIndex:
+    idx = _cached()
+    if idx is None:
+        gen = _state["gen"]
+        idx = _store(await db.run_sync(_load), gen)
+    return idx
+
+
+def invalidate_authz() -> None:
+    """Chamar após commit que mude permissões de grupo ou is_active/is_public/group_id de relatórios."""
+    _state["gen"] += 1
+    _state["index"] = None
+
+
+def allowed_bits(idx: AuthzIndex, user: User | None) -> int:
+    """Relatórios que `user` pode abrir: admin → todos os ativos; anônimo → públicos; senão públicos | RBAC."""
+    if user is None:
+        return idx.public
+    if getattr(user, "is_admin", False):
+        return idx.active
+    return idx.public | idx.union(user.group_ids)
+
+
+class AuthContext:
+    """
+    Autorização resolvida UMA vez por request (core/deps.get_auth_context) e reusada
+    por menu, handlers e templates (request.state.auth). Conjuntos derivados são
+    decodificados do bitmap só quando pedidos, e no máximo 1x.
+    """
+    __slots__ = ("user", "is_admin", "index", "report_bits", "rbac_bits", "_report_ids", "_group_ids", "_rbac_group_ids")
+
+    def __init__(self, idx: AuthzIndex, user: User | None):
+        self.user = user
+        self.is_admin = bool(user and getattr(user, "is_admin", False))
+        self.index = idx
+        self.report_bits = allowed_bits(idx, user)  # pode abrir (admin: todos os ativos)
+        self.rbac_bits = idx.union(user.group_ids) if user and not self.is_admin else 0
+        self._report_ids: frozenset[str] | None = None
+        self._group_ids: frozenset[str] | None = None
+        self._rbac_group_ids: frozenset[str] | None = None
+
+    @property
+    def report_ids(self) -> frozenset[str]:
+        if self._report_ids is None:
+            self._report_ids = self.index.decode(self.report_bits)
+        return self._report_ids
+
+    @property
+    def visible_group_ids(self) -> frozenset[str]:
+        """Grupos de catálogo com ao menos 1 relatório que o usuário pode abrir."""
+        if self._group_ids is None:
+            self._group_ids = self.index.catalog_groups(self.report_bits)
+        return self._group_ids
+
+    @property
+    def rbac_group_ids(self) -> frozenset[str]:
+        """Grupos de catálogo com relatório liberado pelos grupos do usuário (menu: sem os públicos)."""
+        if self._rbac_group_ids is None:
+            self._rbac_group_ids = self.index.catalog_groups(self.rbac_bits)
+        return self._rbac_group_ids
+
+    def can_view(self, report_id: str) -> bool:
+        return self.index.has(self.report_bits, report_id)
+
+
+async def resolve_auth_context(db: AsyncSession, user: User | None) -> AuthContext:
+    return AuthContext(await get_authz_index_async(db), user)
@@ -0,0 +1,157 @@
+"""
+Snapshot em memória do catálogo: grupos (árvore), relatórios ativos e níveis de acesso.
+
+O catálogo muda poucas vezes por dia, mas menu, breadcrumb, cadastro e edição de
+painéis reliam a árvore inteira a cada request. Aqui ele é lido uma vez e guardado
+num CatalogSnapshot imutável (estruturas com __slots__): mapas pai/filhos, filhos
+já ordenados por nome, caminho de cada grupo e índice de relatório por id.
+
+- As mutações de routers/reportRegistrationGroup.py chamam rebuild_catalog(db) após
+  o commit: o snapshot novo é montado inteiro e só então substitui o anterior.
+- Outros workers recarregam em até CATALOG_TTL_SECONDS.
+- Nada aqui é objeto ORM: não depende de sessão aberta.
+- Carga pela AsyncSession (run_sync); um asyncio.Lock evita recargas em paralelo no worker.
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.settings import settings
+from models.models import Group, Report, ReportAccessLevel
+
+
+class GroupNode:
+    __slots__ = ("id", "name", "parent_id", "description", "is_active", "children", "path")
+
+    def __init__(self, id: str, name: str, parent_id: str | None, description: str | None, is_active: bool):
+        self.id = id
+        self.name = name
+        self.parent_id = parent_id
+        self.description = description
+        self.is_active = is_active
+        self.children: tuple[str, ...] = ()  # filhos ativos, ordenados por nome
+        self.path: tuple[str, ...] = ()      # ids da raiz até este grupo (inclusive)
+
+    def __repr__(self) -> str:
+        return f"<GroupNode {self.id}>"
+
+
+class ReportEntry:
+    __slots__ = (
+        "id", "name", "group_id", "sort_order", "is_public", "title_description", "description",
+        "image_url", "workspace_id", "report_id", "powerbi_url", "access_levels",
+    )
+
+    def __init__(self, row, access_levels: frozenset[str]):
+        self.id = row.id
+        self.name = row.name
+        self.group_id = row.group_id
+        self.sort_order = row.sort_order
+        self.is_public = row.is_public
+        self.title_description = row.title_description
+        self.description = row.description
+        self.image_url = row.image_url
+        self.workspace_id = row.workspace_id
+        self.report_id = row.report_id
+        self.powerbi_url = row.powerbi_url
+        self.access_levels = access_levels  # {"gestao", "operacional", ...}
+
+    def __repr__(self) -> str:
+        return f"<ReportEntry {self.id}>"
+
+
+class CatalogSnapshot:
+    __slots__ = ("version", "groups", "roots", "active_groups", "reports")
+
+    def __init__(self, version: int, groups: dict[str, GroupNode], reports: dict[str, ReportEntry]):
+        self.version = version
+        self.groups = groups    # todos os grupos (inclusive inativos, p/ breadcrumb)
+        self.reports = reports  # só relatórios ativos
+        by_name = lambda gid: groups[gid].name.lower()
+
+        kids: dict[str, list[str]] = defaultdict(list)
+        roots = []
+        for g in groups.values():
+            if not g.is_active:
+                continue
+            if g.parent_id is None:
+                roots.append(g.id)
+            elif g.parent_id in groups:
+                kids[g.parent_id].append(g.id)
+        for gid, ids in kids.items():
+            groups[gid].children = tuple(sorted(ids, key=by_name))
+        self.roots: tuple[str, ...] = tuple(sorted(roots, key=by_name))
+        self.active_groups: tuple[GroupNode, ...] = tuple(
+            sorted((g for g in groups.values() if g.is_active), key=lambda g: g.name.lower())
+        )
+
+        for g in groups.values():
+            trail, seen, gid = [], set(), g.id
+            # sobe até a raiz (protege contra ciclos)
+            while gid and gid in groups and gid not in seen:
+                trail.append(gid)
+                seen.add(gid)
+                gid = groups[gid].parent_id
+            g.path = tuple(reversed(trail))
+
+    def breadcrumb(self, group_id: str) -> list[dict]:
+        return [{"id": gid, "name": self.groups[gid].name} for gid in self.groups[group_id].path]
+
+    def path_label(self, group_id: str, sep: str = " >> ") -> str:
+        g = self.groups.get(group_id)
+        return sep.join(self.groups[gid].name for gid in g.path) if g else "-"
+
+
+_lock = asyncio.Lock()
+_state: dict = {"snapshot": None, "expires": 0.0, "version": 0}
+
+
+def _load(db: Session, version: int) -> CatalogSnapshot:
+    groups = {
+        g.id: GroupNode(g.id, g.name, g.parent_id, g.description, g.is_active)
+        for g in db.execute(select(Group.id, Group.name, Group.parent_id, Group.description, Group.is_active))
+    }
+    levels: dict[str, set[str]] = defaultdict(set)
+    for rid, lvl in db.execute(select(ReportAccessLevel.report_id, ReportAccessLevel.level)):
+        levels[rid].add(lvl.value)
+    reports = {
+        r.id: ReportEntry(r, frozenset(levels.get(r.id, ())))
+        for r in db.execute(
+            select(
+                Report.id, Report.name, Report.group_id, Report.sort_order, Report.is_public,
+                Report.title_description, Report.description, Report.image_url,
+                Report.workspace_id, Report.report_id, Report.powerbi_url,
+            ).where(Report.is_active.is_(True))
+        )
+    }
+    return CatalogSnapshot(version, groups, reports)
+
+
+async def _rebuild(db: AsyncSession) -> CatalogSnapshot:
+    snap = await db.run_sync(_load, _state["version"] + 1)
+    _state["version"] = snap.version
+    _state["snapshot"] = snap  # troca atômica da referência
+    _state["expires"] = time.monotonic() + settings.CATALOG_TTL_SECONDS
+    return snap
+
+
+async def rebuild_catalog(db: AsyncSession) -> CatalogSnapshot:
+    """Chamar após o commit de mutações de grupos/relatórios."""
+    async with _lock:
+        return await _rebuild(db)
+
+
+async def get_catalog(db: AsyncSession) -> CatalogSnapshot:
+    snap = _state["snapshot"]
+    if snap is not None and time.monotonic() < _state["expires"]:
+        return snap
+    async with _lock:
+        # outro request pode ter recarregado enquanto esperávamos
+        snap = _state["snapshot"]
+        if snap is not None and time.monotonic() < _state["expires"]:
+            return snap
+        return await _rebuild(db)
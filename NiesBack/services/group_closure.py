@@ -0,0 +1,26 @@
+"""
+Manutenção da tabela group_closure (ver models.GroupClosure): uma linha por par
+(ancestral, descendente) da árvore de grupos, inclusive (g, g, 0).
+
+Subárvore de X: ancestor_id = X. Ancestrais de Y: descendant_id = Y (ordem por depth).
+Grupos só são criados em routers/reportRegistrationGroup.py; chamar add_group_closure
+na mesma transação do INSERT do grupo.
+"""
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import GroupClosure
+
+
+async def add_group_closure(db: AsyncSession, group_id: str, parent_id: str | None) -> None:
+    """Liga o grupo novo a si mesmo e a todos os ancestrais do pai. Quem chama faz o commit."""
+    db.add(GroupClosure(ancestor_id=group_id, descendant_id=group_id, depth=0))
+    await db.flush()  # grupo e linha própria gravados antes do INSERT ... SELECT (FKs)
+    if parent_id is not None:
+        await db.execute(
+            insert(GroupClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(GroupClosure.ancestor_id, literal(group_id), GroupClosure.depth + 1)
+                .where(GroupClosure.descendant_id == parent_id),
+            )
+        )
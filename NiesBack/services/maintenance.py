@@ -0,0 +1,100 @@
+"""
+Manutenção periódica de usuários (core/background, ver main.py):
+- promove p/ approved os pendentes cujo valid_from chegou;
+- bloqueia (blocked) e revoga os tokens de quem passou do valid_to. Não volta p/
+  pending, que é só convite aguardando aprovação; reativar é ação do admin;
+- apaga em lotes os password_resets usados ou expirados.
+Tudo com UPDATE/DELETE set-based. Vários workers/réplicas podem rodar o job:
+no Postgres só quem pega o advisory lock executa.
+"""
+import logging
+from contextlib import suppress
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, or_, select, text, update
+
+from core.settings import settings
+from db import async_engine
+from models.models_rbac import PasswordReset, User, UserStatus
+from services.principal import invalidate_principal
+
+logger = logging.getLogger(__name__)
+
+ADVISORY_LOCK_KEY = 7_318_004  # arbitrário, só precisa ser único na aplicação
+
+
+async def _promote_and_expire(conn, today: date) -> tuple[list[int], list[int]]:
+    # convite com data de início: libera no dia (pendentes sem janela continuam esperando o admin/login)
+    promoted = (await conn.execute(
+        update(User)
+        .where(
+            User.status == UserStatus.pending,
+            User.valid_from.is_not(None),
+            User.valid_from <= today,
+            or_(User.valid_to.is_(None), User.valid_to >= today),
+        )
+        .values(status=UserStatus.approved)
+        .returning(User.id)
+    )).scalars().all()
+
+    # fim da vigência: bloqueia e invalida access/refresh tokens já emitidos
+    expired = (await conn.execute(
+        update(User)
+        .where(User.status == UserStatus.approved, User.valid_to.is_not(None), User.valid_to < today)
+        .values(status=UserStatus.blocked, token_version=User.token_version + 1)
+        .returning(User.id)
+    )).scalars().all()
+    return list(promoted), list(expired)
+
+
+async def _purge_password_resets(conn, now: datetime) -> int:
+    batch = settings.MAINTENANCE_PURGE_BATCH
+    cutoff = now - timedelta(seconds=settings.PASSWORD_RESET_RETENTION_SECONDS)
+    total = 0
+    while True:
+        ids = select(PasswordReset.id).where(
+            or_(PasswordReset.used_at.is_not(None), PasswordReset.expires_at < cutoff)
+        ).limit(batch).scalar_subquery()
+        deleted = (await conn.execute(delete(PasswordReset).where(PasswordReset.id.in_(ids)))).rowcount
+        await conn.commit()  # lotes curtos: não segura lock de linha por muito tempo
+        total += deleted or 0
+        if not deleted or deleted < batch:
+            return total
+
+
+async def _unlock(conn) -> None:
+    try:
+        await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+        await conn.commit()
+    except Exception as e:
+        # lock de sessão preso numa conexão que volta ao pool pararia o job em todos os
+        # workers: descarta a conexão (o Postgres solta o lock junto)
+        logger.warning("Manutenção de usuários: falha ao liberar o advisory lock (%s); descartando a conexão", e)
+        await conn.invalidate()
+
+
+async def run_user_maintenance() -> None:
+    async with async_engine.connect() as conn:
+        is_pg = conn.dialect.name == "postgresql"
+        if is_pg:
+            got = (await conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})).scalar()
+            await conn.commit()
+            if not got:
+                return  # outro worker está rodando
+        try:
+            promoted, expired = await _promote_and_expire(conn, date.today())
+            await conn.commit()
+            purged = await _purge_password_resets(conn, datetime.now())
+        except BaseException:
+            # transação abortada: sem rollback o unlock falharia e esconderia o erro original
+            with suppress(Exception):
+                await conn.rollback()
+            raise
+        finally:
+            if is_pg:
+                await _unlock(conn)
+
+    for uid in promoted + expired:
+        invalidate_principal(uid)  # neste worker; nos outros vale o TTL do cache
+    if promoted or expired or purged:
+        logger.info("Manutenção de usuários: %s liberados, %s expirados, %s resets apagados", len(promoted), len(expired), purged)
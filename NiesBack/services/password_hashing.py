@@ -0,0 +1,167 @@
+"""
+Hash/verificação de senha (bcrypt) num executor próprio e limitado.
+
+bcrypt é CPU pesado: rodando no threadpool padrão, um pico de logins ocupa as
+mesmas threads das páginas síncronas. Aqui:
+- no máximo PASSWORD_HASH_WORKERS hashes em paralelo;
+- no máximo PASSWORD_HASH_QUEUE_MAX esperando; acima disso → 503 imediato (Retry-After);
+- métricas de espera na fila e duração do hash (ver password_hashing_stats).
+
+O custo do bcrypt é calibrado no startup (calibrate_password_hashing): o maior
+custo que cabe em PASSWORD_HASH_BUDGET_MS neste hardware. Hashes com custo abaixo
+dele são refeitos no login (verify_and_update_async); o custo só sobe, nunca desce.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_policy = {"rounds": None, "measured_ms": None}
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+_lock = threading.Lock()
+_pending = 0  # em execução + na fila
+_counters: Counter = Counter()
+_queue_wait_ms: deque = deque(maxlen=1000)
+_hash_ms: deque = deque(maxlen=1000)
+
+
+def _run(fn, args, enqueued_at: float):
+    started = time.perf_counter()
+    _queue_wait_ms.append((started - enqueued_at) * 1000)
+    try:
+        return fn(*args)
+    finally:
+        _hash_ms.append((time.perf_counter() - started) * 1000)
+
+
+def _release(_f: Future) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _submit(fn, *args) -> Future:
+    global _pending
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_MAX:
+            _counters["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Muitas tentativas de login simultâneas, tente novamente em instantes.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        _counters[fn.__name__.lstrip("_")] += 1
+    fut = _executor.submit(_run, fn, args, time.perf_counter())
+    fut.add_done_callback(_release)
+    return fut
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    try:
+        return pwd_ctx.verify(password, password_hash)
+    except Exception:
+        return False  # hash vazio/malformado
+
+
+def _hash(password: str) -> str:
+    return pwd_ctx.hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    try:
+        return pwd_ctx.verify_and_update(password, password_hash)
+    except Exception:
+        return False, None
+
+
+def _calibrate() -> int:
+    lo, hi = settings.PASSWORD_HASH_MIN_ROUNDS, settings.PASSWORD_HASH_MAX_ROUNDS
+    if settings.PASSWORD_HASH_ROUNDS:
+        rounds = settings.PASSWORD_HASH_ROUNDS
+    else:
+        # mede no custo mínimo (melhor de 3) e extrapola: cada round a mais dobra o tempo
+        probe = CryptContext(schemes=["bcrypt"], bcrypt__rounds=lo)
+        samples = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            probe.hash("calibragem")
+            samples.append((time.perf_counter() - t0) * 1000)
+        base_ms = min(samples)
+        rounds = lo
+        while rounds < hi and base_ms * 2 ** (rounds + 1 - lo) <= settings.PASSWORD_HASH_BUDGET_MS:
+            rounds += 1
+        _policy["measured_ms"] = round(base_ms * 2 ** (rounds - lo), 1)
+    # só hashes mais fracos são refeitos no login; sem max_rounds: um pod mais lento
+    # (ou PASSWORD_HASH_ROUNDS menor) não rebaixa hashes de custo maior já gravados
+    pwd_ctx.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+    _policy["rounds"] = rounds
+    return rounds
+
+
+# --- rotas/serviços síncronos (já rodam numa thread do AnyIO) ---
+def hash_password(password: str) -> str:
+    return _submit(_hash, password).result()
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return _submit(_verify, password, password_hash).result()
+
+
+# --- rotas async: não ocupam thread nenhuma enquanto esperam ---
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await asyncio.wrap_future(_submit(_verify, password, password_hash))
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """(senha ok?, novo hash se o atual estiver fora da política de custo)."""
+    return await asyncio.wrap_future(_submit(_verify_and_update, password, password_hash))
+
+
+async def calibrate_password_hashing() -> int:
+    """Startup (lifespan): calibra o custo do bcrypt no próprio executor."""
+    rounds = await asyncio.wrap_future(_executor.submit(_calibrate))
+    if _policy["measured_ms"] is None:
+        logger.info("bcrypt: custo %s (fixo via PASSWORD_HASH_ROUNDS)", rounds)
+    else:
+        logger.info("bcrypt: custo %s (~%s ms/hash, orçamento %s ms)", rounds, _policy["measured_ms"], settings.PASSWORD_HASH_BUDGET_MS)
+    return rounds
+
+
+def _summary(samples: deque) -> dict:
+    values = sorted(samples)
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    pick = lambda p: round(values[min(len(values) - 1, int(p / 100 * len(values)))], 1)
+    return {"p50": pick(50), "p95": pick(95), "max": round(values[-1], 1)}
+
+
+def password_hashing_stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "queue_max": settings.PASSWORD_HASH_QUEUE_MAX,
+        "bcrypt_rounds": _policy["rounds"],
+        "calibrated_ms": _policy["measured_ms"],
+        "pending": _pending,
+        "counters": dict(_counters),
+        "queue_wait_ms": _summary(_queue_wait_ms),
+        "hash_ms": _summary(_hash_ms),
+    }
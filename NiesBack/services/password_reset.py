@@ -1,23 +1,21 @@
 from datetime import datetime, timedelta
+import hashlib
+import hmac
 import secrets
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from models.models_rbac import PasswordReset, User
-from passlib.context import CryptContext
 from core.settings import settings
-
-
-_pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(plain: str) -> str:
-    return _pwd.hash(plain)
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return _pwd.verify(plain, hashed)
+from services.password_hashing import hash_password, verify_password
 
 def _utcnow():
     return datetime.now()
 
+def token_digest(raw_token: str) -> str:
+    # token aleatório de 256 bits: HMAC-SHA256 basta (bcrypt só faz sentido p/ senha escolhida por gente)
+    key = f"password-reset:{settings.SECRET_KEY}".encode()
+    return hmac.new(key, raw_token.encode(), hashlib.sha256).hexdigest()
+
 def create_password_reset(db: Session, user: User) -> tuple[str, str]:
     """
     Cria um reset e retorna (reset_id, raw_token) para montar o link.
@@ -25,7 +23,7 @@ def create_password_reset(db: Session, user: User) -> tuple[str, str]:
     raw_token = secrets.token_urlsafe(32)
     pr = PasswordReset(
         user_id=user.id,
-        token_hash=hash_password(raw_token),
+        token_digest=token_digest(raw_token),
         expires_at=_utcnow() + timedelta(seconds=settings.PASSWORD_RESET_EXPIRES_SECONDS),
     )
     db.add(pr)
@@ -34,17 +32,39 @@ def create_password_reset(db: Session, user: User) -> tuple[str, str]:
     return pr.reset_id, raw_token
 
 def get_valid_password_reset(db: Session, reset_id: str, token: str) -> PasswordReset | None:
+    # busca direta pelo digest (índice único)
     pr = db.execute(
-        select(PasswordReset).where(PasswordReset.reset_id == reset_id)
+        select(PasswordReset).where(PasswordReset.token_digest == token_digest(token))
     ).scalar_one_or_none()
+    if pr is not None and not hmac.compare_digest(pr.reset_id, reset_id):
+        return None
+    if pr is None:
+        pr = _legacy_password_reset(db, reset_id, token)
     if not pr:
         return None
     if pr.used_at is not None:
         return None
     if pr.expires_at < _utcnow():
         return None
+    return pr
+
+def _legacy_password_reset(db: Session, reset_id: str, token: str) -> PasswordReset | None:
+    """Resets criados antes do digest (token_hash bcrypt): valida e migra p/ o formato novo."""
+    pr = db.execute(
+        select(PasswordReset).where(
+            PasswordReset.reset_id == reset_id,
+            PasswordReset.token_digest.is_(None),
+            PasswordReset.token_hash.is_not(None),
+        )
+    ).scalar_one_or_none()
+    if not pr or pr.used_at is not None or pr.expires_at < _utcnow():
+        return None
     if not verify_password(token, pr.token_hash):
         return None
+    pr.token_digest = token_digest(token)
+    pr.token_hash = None
+    db.add(pr)
+    db.commit()
     return pr
 
 def mark_used(db: Session, pr: PasswordReset) -> None:
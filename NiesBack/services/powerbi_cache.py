@@ -0,0 +1,151 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class CachedToken:
+    __slots__ = ("value", "refresh_at", "expires_at")
+
+    def __init__(self, value: Any, refresh_at: float, expires_at: float):
+        self.value = value
+        self.refresh_at = refresh_at  # time.monotonic() a partir do qual renovamos
+        self.expires_at = expires_at
+
+
+class ExpiringTokenCache:
+    """
+    Cache de tokens com expiração, por chave, compartilhado pelo processo.
+    - devolve o token enquanto faltar mais que `refresh_margin` segundos p/ expirar;
+    - dentro da margem (ou expirado) renova ANTES de expirar;
+    - chamadas concorrentes p/ a mesma chave aguardam uma única renovação (single-flight);
+    - com `stale_wait` definido (stale-while-revalidate), um token ainda válido é
+      servido se a renovação demorar mais que `stale_wait` s ou falhar; a renovação
+      segue em background.
+    O `fetch(key)` deve retornar (valor, segundos_até_expirar).
+    """
+
+    def __init__(
+        self,
+        refresh_margin: float,
+        stale_wait: float | None = None,
+        stale_min_ttl: float = 60,
+        max_entries: int | None = None,
+    ):
+        self.refresh_margin = refresh_margin
+        self.stale_wait = stale_wait
+        self.stale_min_ttl = stale_min_ttl  # não serve token "velho" com menos que isso de vida
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, CachedToken] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _fresh(self, entry: CachedToken | None, now: float) -> bool:
+        return entry is not None and now < entry.refresh_at
+
+    def _usable_stale(self, entry: CachedToken | None, now: float) -> bool:
+        return (
+            self.stale_wait is not None
+            and entry is not None
+            and now < entry.expires_at - self.stale_min_ttl
+        )
+
+    def peek(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        return entry.value if self._fresh(entry, time.monotonic()) else None
+
+    async def get(self, key: Hashable, fetch: Callable[[Hashable], Awaitable[tuple[Any, float]]]) -> Any:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if self._fresh(entry, now):
+            self.hits += 1
+            return entry.value
+
+        fut = self._start_refresh(key, fetch)
+
+        if self._usable_stale(entry, now):
+            # stale-while-revalidate: espera um pouco pela renovação; se o Power BI
+            # estiver lento (ou falhar), entrega o token atual, que ainda é válido
+            try:
+                value = await asyncio.wait_for(asyncio.shield(fut), timeout=self.stale_wait)
+                self.misses += 1
+                return value
+            except Exception:
+                self.stale_hits += 1
+                return entry.value
+
+        self.misses += 1
+        # shield: se um chamador for cancelado, a renovação continua p/ os demais
+        return await asyncio.shield(fut)
+
+    async def refresh(self, key: Hashable, fetch) -> Any:
+        """Força a renovação de `key` (usado por tarefas em background); respeita o single-flight."""
+        return await asyncio.shield(self._start_refresh(key, fetch))
+
+    def _start_refresh(self, key: Hashable, fetch) -> asyncio.Future:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._refresh(key, fetch))
+            # renovação em background pode falhar sem ninguém aguardando: consome o erro
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = fut
+        return fut
+
+    async def _refresh(self, key: Hashable, fetch) -> Any:
+        try:
+            value, expires_in = await fetch(key)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.refreshes += 1
+        now = time.monotonic()
+        expires_in = float(expires_in)
+        # tokens de vida curta: nunca renovar antes da metade da validade
+        margin = min(self.refresh_margin, expires_in / 2)
+        self._entries[key] = CachedToken(value, now + expires_in - margin, now + expires_in)
+        self._prune(now)
+        return value
+
+    def _prune(self, now: float) -> None:
+        if not self.max_entries or len(self._entries) <= self.max_entries:
+            return
+        for k in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[k]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self._entries.items(), key=lambda kv: kv[1].expires_at)[:overflow]
+            for k, _ in oldest:
+                del self._entries[k]
+
+    def keys(self) -> list[Hashable]:
+        return list(self._entries)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        doomed = [k for k in self._entries if predicate(k)]
+        for k in doomed:
+            del self._entries[k]
+        return len(doomed)
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.stale_hits) / total, 4) if total else None,
+        }
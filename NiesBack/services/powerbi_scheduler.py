@@ -0,0 +1,237 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+import httpx
+from fastapi import HTTPException
+
+from core.http import get_http_client
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _unavailable(detail: str, retry_after: float) -> HTTPException:
+    # 503 + Retry-After: o navegador não deve martelar a API enquanto o Power BI estiver limitando
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+
+
+def parse_retry_after(value: str | None, default: float) -> float:
+    """Retry-After pode vir em segundos ou como data HTTP."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Orçamento de requisições (rate/s, rajada `capacity`) + bloqueio vindo de Retry-After."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, deadline: float) -> None:
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                wait = self.blocked_until - now
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return
+            else:
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                raise _unavailable("Power BI ocupado, tente novamente em instantes.", wait)
+            await asyncio.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """closed → (N falhas seguidas) → open → (após reset_timeout) half-open → 1 tentativa."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_request(self) -> bool:
+        """True se esta chamada ficou com a tentativa do half-open (quem a pegou é quem libera)."""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        retry_after = self.reset_timeout - (time.monotonic() - (self.opened_at or 0))
+        raise _unavailable("Power BI indisponível no momento.", max(1.0, retry_after))
+
+    def release_trial(self) -> None:
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+
+class PowerBIScheduler:
+    """
+    Agendador das chamadas de saída para a API do Power BI:
+    - token bucket por workspace, respeitando Retry-After dos 429;
+    - fila com espera limitada (`max_wait`) e profundidade máxima (`max_queue`) → 503 rápido;
+    - retry com backoff + jitter: 429 em qualquer método (não foi processado),
+      5xx/erro de rede só em métodos idempotentes (GET);
+    - circuit breaker para falhar rápido quando a API estiver fora.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_wait: float,
+        max_queue: int,
+        retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        breaker_failures: int,
+        breaker_reset: float,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self._buckets: dict[str, TokenBucket] = {}
+        self.queue_depth = 0
+        self.max_queue_depth_seen = 0
+        self.counters: Counter = Counter()
+
+    def _bucket(self, workspace_id: str | None) -> TokenBucket:
+        key = workspace_id or "_global"
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return b
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": aleatório entre 0 e base * 2^tentativa
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _admit(self, bucket: TokenBucket, deadline: float) -> None:
+        if self.queue_depth >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise _unavailable("Muitas requisições ao Power BI na fila.", 1)
+        self.queue_depth += 1
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.queue_depth)
+        try:
+            await bucket.acquire(deadline)
+        except HTTPException:
+            self.counters["rejected_wait_timeout"] += 1
+            raise
+        finally:
+            self.queue_depth -= 1
+
+    async def request(self, method: str, url: str, workspace_id: str | None = None, **kwargs) -> httpx.Response:
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        bucket = self._bucket(workspace_id)
+        deadline = time.monotonic() + self.max_wait
+        attempt = 0
+
+        while True:
+            trial = self.breaker.before_request()
+            try:
+                await self._admit(bucket, deadline)
+                self.counters["requests"] += 1
+                r = await get_http_client().request(method, url, **kwargs)
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                self.counters["transport_errors"] += 1
+                if idempotent and attempt < self.retries:
+                    attempt += 1
+                    self.counters["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                raise _unavailable("Falha de comunicação com o Power BI.", self._backoff(attempt + 1))
+            except BaseException:
+                # fila cheia/timeout, cancelamento ou erro inesperado (InvalidURL, DecodingError...):
+                # sem desfecho p/ o breaker, então a tentativa do half-open não pode ficar presa
+                if trial:
+                    self.breaker.release_trial()
+                raise
+
+            if r.status_code == 429:
+                # limitado: não conta como falha do serviço, mas segura o workspace inteiro
+                self.breaker.record_success()
+                self.counters["throttled"] += 1
+                wait = parse_retry_after(r.headers.get("Retry-After"), self._backoff(attempt + 1))
+                bucket.block_for(wait)
+                if attempt < self.retries and time.monotonic() + wait <= deadline:
+                    attempt += 1
+                    self.counters["retries"] += 1
+                    continue  # o bucket espera o Retry-After
+                raise _unavailable("Power BI ocupado, tente novamente em instantes.", wait)
+
+            if r.status_code >= 500:
+                self.breaker.record_failure()
+                self.counters["server_errors"] += 1
+                if idempotent and attempt < self.retries:
+                    attempt += 1
+                    self.counters["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                return r
+
+            self.breaker.record_success()
+            return r
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "breaker": self.breaker.state,
+            "blocked_workspaces": sorted(k for k, b in self._buckets.items() if b.blocked_until > now),
+            "counters": dict(self.counters),
+        }
@@ -0,0 +1,94 @@
+import time
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.settings import settings
+from models.models_rbac import User, UserGroupMember, UserStatus
+
+
+class Principal:
+    """
+    Snapshot do usuário autenticado com só o que as páginas usam
+    (id, nome, status, admin, janela de validade, grupos, versão do token). Não é objeto ORM.
+    """
+    __slots__ = ("id", "name", "status", "is_admin", "valid_from", "valid_to", "group_ids", "token_version")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        status: UserStatus,
+        is_admin: bool,
+        valid_from: date | None,
+        valid_to: date | None,
+        group_ids: frozenset[int],
+        token_version: int = 0,
+    ):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.is_admin = is_admin
+        self.valid_from = valid_from
+        self.valid_to = valid_to
+        self.group_ids = group_ids
+        self.token_version = token_version
+
+    def __repr__(self) -> str:
+        return f"<Principal id={self.id} admin={self.is_admin} status={self.status.value}>"
+
+
+# user_id -> (Principal, expira_em monotonic); cache por worker, TTL curto
+_cache: dict[int, tuple[Principal, float]] = {}
+
+
+def _load(db: Session, user_id: int) -> Principal | None:
+    u = db.get(User, user_id)
+    if not u:
+        return None
+    group_ids = db.execute(
+        select(UserGroupMember.group_id).where(UserGroupMember.user_id == user_id)
+    ).scalars().all()
+    return Principal(
+        id=u.id,
+        name=u.name,
+        status=u.status,
+        is_admin=u.is_admin,
+        valid_from=u.valid_from,
+        valid_to=u.valid_to,
+        group_ids=frozenset(group_ids),
+        token_version=u.token_version or 0,
+    )
+
+
+async def get_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    now = time.monotonic()
+    hit = _cache.get(user_id)
+    if hit and now < hit[1]:
+        return hit[0]
+
+    p = await db.run_sync(_load, user_id)
+    if p is None:
+        _cache.pop(user_id, None)
+        return None
+    if len(_cache) >= settings.PRINCIPAL_CACHE_MAX:
+        _prune(now)
+    _cache[user_id] = (p, now + settings.PRINCIPAL_CACHE_TTL_SECONDS)
+    return p
+
+
+def _prune(now: float) -> None:
+    for k in [k for k, (_, exp) in list(_cache.items()) if exp <= now]:
+        _cache.pop(k, None)
+    if len(_cache) >= settings.PRINCIPAL_CACHE_MAX:
+        _cache.clear()
+
+
+def invalidate_principal(user_id: int | None = None) -> None:
+    """Chamar sempre que status/admin/validade/grupos/senha do usuário mudarem (None = todos)."""
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(user_id, None)
@@ -0,0 +1,199 @@
+"""
+Limitador de tentativas por janela deslizante (aproximação de duas janelas fixas:
+conta a janela atual + a anterior ponderada pelo quanto dela ainda "cabe").
+Memória: 2 contadores por chave ativa.
+
+Backends:
+- LocalBackend: por worker, LRU limitada a RATE_LIMIT_MAX_KEYS chaves;
+- SharedBackend: contadores compartilhados entre workers/réplicas no Redis
+  (redis.asyncio, se RATE_LIMIT_REDIS_URL estiver definido) ou no InMemoryRedis
+  abaixo, que serve de stand-in em testes/desenvolvimento.
+
+A tentativa é contada ANTES da decisão (INCR atômico) e a decisão usa o valor
+devolvido: tentativas concorrentes, em qualquer worker, recebem contagens distintas
+e não passam todas do limite. Rejeitada é descontada em seguida (DECR), e a tentativa barrada pelo limite do
+e-mail também é descontada do limite do IP.
+"""
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from core.settings import settings
+
+
+class LocalBackend:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+    async def incr(self, prev_key: str, key: str, ttl: int) -> tuple[int, int]:
+        # sem await no meio: atômico dentro do worker
+        cur = self._counts.get(key, 0) + 1
+        self._counts[key] = cur
+        self._counts.move_to_end(key)
+        while len(self._counts) > self.max_keys:
+            self._counts.popitem(last=False)  # descarta a chave menos recente
+        return self._counts.get(prev_key, 0), cur
+
+    async def decr(self, key: str) -> None:
+        if key in self._counts:
+            self._counts[key] -= 1
+
+
+class SharedBackend:
+    def __init__(self, client, prefix: str = "rl:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def incr(self, prev_key: str, key: str, ttl: int) -> tuple[int, int]:
+        """Lê a janela anterior e incrementa a atual numa transação (MULTI/EXEC), 1 round trip."""
+        k = self.prefix + key
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self.prefix + prev_key)
+        pipe.incr(k)
+        pipe.expire(k, ttl)
+        prev, cur, _ = await pipe.execute()
+        return int(prev or 0), int(cur)
+
+    async def decr(self, key: str) -> None:
+        await self.client.decr(self.prefix + key)
+
+
+class InMemoryRedis:
+    """
+    Stand-in mínimo do redis.asyncio (get/incr/expire/decr e pipeline) p/ o SharedBackend.
+    Um execute() roda todos os comandos sem await no meio: atômico como o MULTI/EXEC.
+    """
+
+    def __init__(self):
+        self._data: dict[str, tuple[int, float | None]] = {}
+
+    def _live(self, key: str) -> int | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def _incr(self, key: str, amount: int) -> int:
+        value = (self._live(key) or 0) + amount
+        self._data[key] = (value, self._data.get(key, (0, None))[1])  # INCR/DECR mantêm o TTL
+        return value
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        if self._live(key) is None:
+            return False
+        self._data[key] = (self._data[key][0], time.monotonic() + seconds)
+        return True
+
+    async def get(self, key: str) -> int | None:
+        return self._live(key)
+
+    async def incr(self, key: str) -> int:
+        return self._incr(key, 1)
+
+    async def decr(self, key: str) -> int:
+        return self._incr(key, -1)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return self._expire(key, seconds)
+
+    def pipeline(self, transaction: bool = True) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._ops: list = []
+
+    def get(self, key: str) -> "InMemoryPipeline":
+        self._ops.append(lambda c: c._live(key))
+        return self
+
+    def incr(self, key: str) -> "InMemoryPipeline":
+        self._ops.append(lambda c: c._incr(key, 1))
+        return self
+
+    def decr(self, key: str) -> "InMemoryPipeline":
+        self._ops.append(lambda c: c._incr(key, -1))
+        return self
+
+    def expire(self, key: str, seconds: int) -> "InMemoryPipeline":
+        self._ops.append(lambda c: c._expire(key, seconds))
+        return self
+
+    async def execute(self) -> list:
+        ops, self._ops = self._ops, []
+        return [op(self._client) for op in ops]
+
+
+class SlidingWindowLimiter:
+    def __init__(self, backend, limit: int, window: int):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.rejected = 0
+
+    async def hit(self, key: str, now: float | None = None) -> float | None:
+        """Conta uma tentativa. Devolve None se permitida, ou os segundos até liberar."""
+        now = time.time() if now is None else now
+        slot = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        cur_key = f"{key}:{slot}"
+        prev, cur = await self.backend.incr(f"{key}:{slot - 1}", cur_key, ttl=self.window * 2)
+        cur -= 1  # tentativas anteriores a esta
+        estimate = prev * (1 - elapsed) + cur
+        if estimate >= self.limit:
+            # rejeitada não conta: quem insiste não empurra a janela p/ frente
+            await self.backend.decr(cur_key)
+            self.rejected += 1
+            if cur >= self.limit:
+                return (1 - elapsed) * self.window
+            # espera até o peso da janela anterior cair o suficiente
+            need = (prev - (self.limit - cur)) / max(prev, 1)
+            return max(1.0, (need - elapsed) * self.window)
+        return None
+
+    async def release(self, key: str, now: float) -> None:
+        """Desconta uma tentativa que hit(key, now) aceitou, mas outro limite rejeitou."""
+        await self.backend.decr(f"{key}:{int(now // self.window)}")
+
+
+def _build_backend():
+    if settings.RATE_LIMIT_REDIS_URL:
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            # sem fallback p/ o limite local: com N workers ele multiplicaria o limite por N
+            raise RuntimeError("RATE_LIMIT_REDIS_URL definido, mas o pacote 'redis' não está instalado.") from e
+        return SharedBackend(redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    return LocalBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+_backend = _build_backend()
+login_by_email = SlidingWindowLimiter(_backend, settings.LOGIN_LIMIT_PER_EMAIL, settings.LOGIN_LIMIT_WINDOW_SECONDS)
+login_by_ip = SlidingWindowLimiter(_backend, settings.LOGIN_LIMIT_PER_IP, settings.LOGIN_LIMIT_WINDOW_SECONDS)
+
+
+async def check_login_rate(email: str, ip: str | None) -> None:
+    """Antes de banco/bcrypt: 429 + Retry-After se o e-mail ou o IP passou do limite."""
+    now = time.time()
+    ip_key = f"login:ip:{ip or '-'}"
+    retry_after = await login_by_ip.hit(ip_key, now)
+    if retry_after is None:
+        retry_after = await login_by_email.hit(f"login:email:{email}", now)
+        if retry_after is not None:
+            # barrada pelo e-mail: não gasta o limite do IP (outros usuários atrás do mesmo NAT/proxy)
+            await login_by_ip.release(ip_key, now)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas de login. Aguarde e tente novamente.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
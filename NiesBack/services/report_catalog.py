@@ -0,0 +1,147 @@
+"""
+Listagem paginada de relatórios p/ os cards (home, página de grupo, /api/catalog).
+
+- Projeção: só as colunas do card; a descrição vai cortada (`summary`).
+- Paginação keyset em (sort_order NULLS LAST, name, id): sem OFFSET, custo
+  constante por página e estável com inserções (índice ix_reports_catalog_order).
+- Filtros: group_id, is_public e nível de acesso (ReportAccessLevel); facetas
+  com a contagem por nível (sem o filtro de nível) na primeira página.
+
+Os statements servem à sessão síncrona (páginas) e à AsyncSession (API).
+"""
+import base64
+import json
+
+from sqlalchemy import and_, exists, false, func, or_, select, tuple_
+
+from core.settings import settings
+from models.models import AccessLevel, Report, ReportAccessLevel
+from models.models_rbac import GroupReportPermission
+from services.authz import AuthContext
+
+_ORDER = (Report.sort_order.asc().nulls_last(), Report.name.asc(), Report.id.asc())
+
+
+def encode_cursor(row) -> str:
+    raw = json.dumps([row.sort_order, row.name, row.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int | None, str, str]:
+    """ValueError se o cursor for inválido."""
+    try:
+        sort_order, name, rid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("cursor inválido")
+    if not (sort_order is None or isinstance(sort_order, int)) or not isinstance(name, str) or not isinstance(rid, str):
+        raise ValueError("cursor inválido")
+    return sort_order, name, rid
+
+
+def _after(cursor: tuple[int | None, str, str]):
+    sort_order, name, rid = cursor
+    same_key = tuple_(Report.name, Report.id) > tuple_(name, rid)
+    if sort_order is None:
+        # já estamos no fim (NULLs): só avança por (name, id)
+        return and_(Report.sort_order.is_(None), same_key)
+    return or_(
+        Report.sort_order.is_(None),
+        Report.sort_order > sort_order,
+        and_(Report.sort_order == sort_order, same_key),
+    )
+
+
+def _visibility(auth: AuthContext, group_id: str | None):
+    if auth.is_admin:
+        return None
+    idx = auth.index
+    scope = auth.report_bits & idx.by_catalog_group.get(group_id, 0) if group_id else auth.report_bits
+    if scope.bit_count() <= settings.CATALOG_MAX_IN_IDS:
+        # poucos ids (caso comum na página de grupo): vem do bitmap, sem tocar em permissões no banco
+        return Report.id.in_(idx.decode(scope)) if scope else false()
+    # listas grandes: semijoin pelos grupos do usuário é mais barato que um IN com milhares de ids
+    if auth.user is None:
+        return Report.is_public.is_(True)
+    return or_(
+        Report.is_public.is_(True),
+        exists().where(
+            GroupReportPermission.report_id == Report.id,
+            GroupReportPermission.group_id.in_(auth.user.group_ids),
+        ),
+    )
+
+
+def _filters(auth: AuthContext, group_id: str | None, is_public: bool | None) -> list:
+    conds = [Report.is_active.is_(True)]
+    visible = _visibility(auth, group_id)
+    if visible is not None:
+        conds.append(visible)
+    if group_id:
+        conds.append(Report.group_id == group_id)
+    if is_public is not None:
+        conds.append(Report.is_public.is_(is_public))
+    return conds
+
+
+def _has_level(level: AccessLevel):
+    return exists().where(ReportAccessLevel.report_id == Report.id, ReportAccessLevel.level == level)
+
+
+def page_query(
+    auth: AuthContext,
+    *,
+    group_id: str | None = None,
+    is_public: bool | None = None,
+    level: AccessLevel | None = None,
+    cursor: tuple[int | None, str, str] | None = None,
+    limit: int,
+):
+    """SELECT da página; busca limit+1 linhas p/ saber se há próxima."""
+    conds = _filters(auth, group_id, is_public)
+    if level is not None:
+        conds.append(_has_level(level))
+    if cursor is not None:
+        conds.append(_after(cursor))
+    summary = func.coalesce(func.nullif(Report.title_description, ""), func.substr(Report.description, 1, settings.CATALOG_SUMMARY_CHARS))
+    return (
+        select(
+            Report.id, Report.name, Report.group_id, Report.sort_order, Report.is_public,
+            Report.image_url, summary.label("summary"),
+        )
+        .where(*conds)
+        .order_by(*_ORDER)
+        .limit(limit + 1)
+    )
+
+
+def facets_query(auth: AuthContext, *, group_id: str | None = None, is_public: bool | None = None):
+    """Contagem de relatórios por nível de acesso, com os demais filtros aplicados."""
+    return (
+        select(ReportAccessLevel.level, func.count())
+        .join(Report, Report.id == ReportAccessLevel.report_id)
+        .where(*_filters(auth, group_id, is_public))
+        .group_by(ReportAccessLevel.level)
+    )
+
+
+def build_page(rows, limit: int, facets=None) -> dict:
+    items = rows[:limit]
+    page = {
+        "items": [
+            {
+                "id": r.id,
+                "name": r.name,
+                "group_id": r.group_id,
+                "is_public": r.is_public,
+                "image_url": r.image_url,
+                "summary": r.summary,
+            }
+            for r in items
+        ],
+        "next_cursor": encode_cursor(items[-1]) if len(rows) > limit else None,
+    }
+    if facets is not None:
+        counts = {lvl.value: 0 for lvl in AccessLevel}
+        counts.update({lvl.value: n for lvl, n in facets})
+        page["facets"] = {"access_level": counts}
+    return page
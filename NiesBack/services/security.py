@@ -1,30 +1,24 @@
 from core.settings import settings
-from db import get_db
+from db import get_async_db
 from models.models_rbac import User, UserStatus
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, Depends, Header, Request, Response
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Annotated
-from jose import jwt, JWTError, ExpiredSignatureError
-from passlib.context import CryptContext
+from jose import jwt, JWTError
 from starlette import status
+from services.principal import Principal, get_principal
+from services.token_revocation import is_revoked
 
-ACCESS_EXPIRES = timedelta(minutes=1)
-REFRESH_EXPIRES = timedelta(days=7)
+ACCESS_EXPIRES = timedelta(seconds=settings.ACCESS_TOKEN_EXPIRES_SECONDS)
+REFRESH_EXPIRES = timedelta(seconds=settings.REFRESH_TOKEN_EXPIRES_SECONDS)
+RENEW_BEFORE = timedelta(seconds=settings.ACCESS_TOKEN_RENEW_BEFORE_SECONDS)
 SECRET_KEY = settings.SECRET_KEY
 ALGO = "HS256"
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_ctx.hash(password)
-
-def verify_password(password: str, password_hash: str) -> bool:
-    try:
-        return pwd_ctx.verify(password, password_hash)
-    except Exception:
-        return False
+# bcrypt roda no executor dedicado (services/password_hashing.py)
+from services.password_hashing import hash_password, verify_password
 
 def _now() -> datetime:
     return datetime.now(timezone.utc)
@@ -32,23 +26,47 @@ def _now() -> datetime:
 def _exp(delta: timedelta) -> int:
     return int((_now() + delta).timestamp())
 
-def create_access_token(sub: str, is_admin: bool, expires_delta: timedelta) -> str:
+def create_access_token(sub: str, is_admin: bool, expires_delta: timedelta, ver: int = 0) -> str:
     claims = {
         "sub": sub,
         "is_admin": is_admin,
         "type": "access",
+        "ver": ver,  # users.token_version (ver services/token_revocation.py)
         "exp": _exp(expires_delta),
     }
     return jwt.encode(claims, SECRET_KEY, algorithm=ALGO)
 
-def create_refresh_token(sub: str, expires_delta: timedelta) -> str:
+def create_refresh_token(sub: str, expires_delta: timedelta, ver: int = 0) -> str:
     claims = {
         "sub": sub,
         "type": "refresh",
+        "ver": ver,
         "exp": _exp(expires_delta),
     }
     return jwt.encode(claims, SECRET_KEY, algorithm=ALGO)
 
+def set_access_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key="access_token",
+        value=token,
+        httponly=True,
+        secure=False,      # True em produção (HTTPS)
+        samesite="lax",
+        path="/",
+        max_age=int(ACCESS_EXPIRES.total_seconds()),
+    )
+
+def set_refresh_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key="refresh_token",
+        value=token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        path="/",
+        max_age=int(REFRESH_EXPIRES.total_seconds()),
+    )
+
 def decode_token_safely(token: str, verify_type: Optional[str] = None) -> Optional[dict]:
     try:
         claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
@@ -60,12 +78,44 @@ def decode_token_safely(token: str, verify_type: Optional[str] = None) -> Option
     
     
     
-def get_current_user_optional(
+def _reissue_access(request: Request, user: Principal, ver: int) -> None:
+    # a página costuma devolver TemplateResponse, que ignora cookies do `response` da dependência:
+    # o middleware apply_auth_cookies (main.py) grava este cookie na resposta final
+    request.state.access_cookie = create_access_token(
+        sub=str(user.id),
+        is_admin=user.is_admin,
+        expires_delta=ACCESS_EXPIRES,
+        ver=ver,
+    )
+
+
+async def _user_from_claims(db: AsyncSession, claims: dict | None) -> Optional[Principal]:
+    if not claims or not claims.get("sub"):
+        return None
+    # revogação checada em memória; usuário vem do cache de Principal (sem SELECT em users)
+    if is_revoked(claims):
+        return None
+    user = await get_principal(db, int(claims["sub"]))
+    if not user or user.status != UserStatus.approved or is_revoked(claims, user.token_version):
+        return None
+    return user
+
+
+async def _user_from_refresh(request: Request, db: AsyncSession) -> Optional[Principal]:
+    rt = request.cookies.get("refresh_token")
+    claims = decode_token_safely(rt, verify_type="refresh") if rt else None
+    user = await _user_from_claims(db, claims)
+    if user:
+        _reissue_access(request, user, claims.get("ver", 0))
+    return user
+
+
+async def get_current_user_optional(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: Optional[str] = Header(default=None, alias="Authorization"),
-) -> Optional[User]:
+) -> Optional[Principal]:
     token: Optional[str] = None
 
     # 1) tenta Authorization: Bearer <token>
@@ -76,118 +126,30 @@ def get_current_user_optional(
     if not token:
         token = request.cookies.get("access_token")
 
-    # ---------- CASO 0: não há access_token ----------
+    # ---------- CASO 0: não há access_token → tenta renovar com o refresh_token ----------
     if not token:
-        # tenta renovar usando apenas o refresh_token
-        rt = request.cookies.get("refresh_token")
-        claims = decode_token_safely(rt, verify_type="refresh") if rt else None
-        if not claims:
-            return None
-
-        uid = claims.get("sub")
-        if not uid:
-            return None
-
-        user = db.get(User, int(uid))
-        if not user or user.status != UserStatus.approved:
-            return None
-
-        # emite novo access e renova cookie
-        new_access = create_access_token(
-            sub=str(user.id),
-            is_admin=user.is_admin,
-            expires_delta=ACCESS_EXPIRES,
-        )
-        response.set_cookie(
-            key="access_token",
-            value=new_access,
-            httponly=True,
-            secure=False,      # True em produção (HTTPS)
-            samesite="lax",
-            path="/",
-            max_age=int(ACCESS_EXPIRES.total_seconds()),
-        )
-        return user
+        return await _user_from_refresh(request, db)
 
     # ---------- CASO 1: há access_token ----------
     try:
-        data = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGO])
-        if data.get("type") != "access":
-            return None
-
-        uid = data.get("sub")
-        if not uid:
-            return None
-
-        user = db.get(User, int(uid))
-        if not user or user.status != UserStatus.approved:
-            return None
-
-        return user
-
-    except ExpiredSignatureError:
-        # access expirou → tenta refresh
-        rt = request.cookies.get("refresh_token")
-        claims = decode_token_safely(rt, verify_type="refresh") if rt else None
-        if not claims:
-            return None
-
-        uid = claims.get("sub")
-        if not uid:
-            return None
-
-        user = db.get(User, int(uid))
-        if not user or user.status != UserStatus.approved:
-            return None
-
-        new_access = create_access_token(
-            sub=str(user.id),
-            is_admin=user.is_admin,
-            expires_delta=ACCESS_EXPIRES,
-        )
-        response.set_cookie(
-            key="access_token",
-            value=new_access,
-            httponly=True,
-            secure=False,
-            samesite="lax",
-            path="/",
-            max_age=int(ACCESS_EXPIRES.total_seconds()),
-        )
-        return user
-
+        data = jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
     except JWTError:
-        # token inválido → tenta refresh como último recurso
-        rt = request.cookies.get("refresh_token")
-        claims = decode_token_safely(rt, verify_type="refresh") if rt else None
-        if not claims:
-            return None
+        # expirado (ExpiredSignatureError) ou inválido → tenta refresh
+        return await _user_from_refresh(request, db)
 
-        uid = claims.get("sub")
-        if not uid:
-            return None
+    if data.get("type") != "access":
+        return None
+    user = await _user_from_claims(db, data)
+    if not user:
+        return None
 
-        user = db.get(User, int(uid))
-        if not user or user.status != UserStatus.approved:
-            return None
+    # só emite cookie novo quando o atual está perto de expirar
+    if data.get("exp", 0) - _now().timestamp() < RENEW_BEFORE.total_seconds():
+        _reissue_access(request, user, data.get("ver", 0))
+    return user
 
-        new_access = create_access_token(
-            sub=str(user.id),
-            is_admin=user.is_admin,
-            expires_delta=ACCESS_EXPIRES,
-        )
-        response.set_cookie(
-            key="access_token",
-            value=new_access,
-            httponly=True,
-            secure=False,
-            samesite="lax",
-            path="/",
-            max_age=int(ACCESS_EXPIRES.total_seconds()),
-        )
-        return user
-    
-def require_admin(user: User | None = Depends(get_current_user_optional)) -> User:
+
+async def require_admin(user: Principal | None = Depends(get_current_user_optional)) -> Principal:
     if not user:
         # 303 + Location faz o redirect
         raise HTTPException(
@@ -202,13 +164,13 @@ def require_admin(user: User | None = Depends(get_current_user_optional)) -> Use
     return user
 
 
-def get_current_user(
+async def get_current_user(
     request: Request,
     response: Response,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
     authorization: Optional[str] = Header(default=None, alias="Authorization"),
-) -> User:
-    user = get_current_user_optional(request, response, db, authorization)
+) -> Principal:
+    user = await get_current_user_optional(request, response, db, authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
@@ -0,0 +1,71 @@
+"""
+Revogação de tokens por versão: cada usuário tem `users.token_version`, que vai nas
+claims ("ver") do access/refresh token. Incrementar a versão invalida todos os tokens
+emitidos antes (troca de senha, bloqueio...).
+
+Em memória fica só quem já teve a versão incrementada ({user_id: versão}), sincronizado
+do banco periodicamente (core/background). Assim o refresh do access token não precisa
+ler o banco; outros workers enxergam uma revogação em até TOKEN_REVOCATION_SYNC_SECONDS.
+"""
+import threading
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from db import AsyncSessionLocal
+from models.models_rbac import User
+
+_versions: dict[int, int] = {}
+_lock = threading.Lock()  # rotas síncronas (threads) e a sync periódica (event loop) escrevem aqui
+_PENDING = "revoked_token_versions"  # Session.info: versões a publicar quando o commit sair
+
+
+def current_version(user_id: int) -> int:
+    return _versions.get(user_id, 0)
+
+
+def is_revoked(claims: dict, known_version: int = 0) -> bool:
+    """True se o token foi emitido antes da versão atual do usuário."""
+    try:
+        uid = int(claims["sub"])
+        ver = int(claims.get("ver", 0))
+    except (KeyError, TypeError, ValueError):
+        return True
+    return ver < max(known_version, current_version(uid))
+
+
+def _merge(versions: dict[int, int]) -> None:
+    # versão só sobe: nunca troca por uma mais antiga (ex.: sync que leu o banco antes de um commit)
+    with _lock:
+        for uid, ver in versions.items():
+            if ver > _versions.get(uid, 0):
+                _versions[uid] = ver
+
+
+def revoke_user_tokens(db: Session, user: User) -> None:
+    """Invalida todos os tokens do usuário. Quem chama faz o commit; este worker passa a barrar após ele."""
+    user.token_version = (user.token_version or 0) + 1
+    db.add(user)
+    db.info.setdefault(_PENDING, {})[user.id] = user.token_version
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        _merge(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    # commit falhou/desfeito: a versão no banco não mudou, o mapa também não
+    session.info.pop(_PENDING, None)
+
+
+async def sync_revocations() -> None:
+    """Tarefa periódica: traz do banco as versões revogadas (inclusive por outros workers)."""
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(select(User.id, User.token_version).where(User.token_version > 0))
+        ).all()
+    _merge({uid: ver for uid, ver in rows})
@@ -0,0 +1,193 @@
+"""
+Importação em massa de usuários (CSV/XLSX) → convites por e-mail.
+
+Mesmo fluxo do /register/user-register (o usuário só é criado no /register/confirm),
+mas com a validação feita em lote: a planilha é lida inteira, e-mails/CPFs já
+cadastrados e grupos são resolvidos com poucas consultas (ver routers/userRegister.py).
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from pydantic import ValidationError
+
+from schemas.schemas_rbac import UserCreate
+
+# cabeçalhos aceitos (pt/en) → campo do UserCreate
+COLUMNS = {
+    "nome": "name", "name": "name",
+    "cpf": "cpf",
+    "email": "email", "e-mail": "email",
+    "telefone": "phone", "phone": "phone",
+    "status": "status",
+    "inicio": "valid_from", "início": "valid_from", "valid_from": "valid_from",
+    "fim": "valid_to", "valid_to": "valid_to",
+    "grupos": "groups", "groups": "groups",
+}
+TEMPLATE_HEADER = ["nome", "cpf", "email", "telefone", "status", "inicio", "fim", "grupos"]
+TEMPLATE_EXAMPLE = ["Maria da Silva", "12345678901", "maria@exemplo.sp.gov.br", "11999999999",
+                    "approved", "2025-01-01", "31/12/2025", "Regional Norte; Vigilância"]
+
+
+def _cell(v) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _parse_date(v) -> date | None:
+    if v is None or v == "":
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida: {s!r} (use AAAA-MM-DD ou DD/MM/AAAA)")
+
+
+def _read_csv(content: bytes) -> list[list]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = content.decode("latin-1")  # CSV salvo pelo Excel
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+
+def _read_xlsx(content: bytes) -> list[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Importação de XLSX requer o pacote 'openpyxl'; envie em CSV.")
+    wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        return [list(r) for r in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def read_rows(filename: str, content: bytes) -> list[tuple[int, dict]]:
+    """(nº da linha na planilha, {campo: valor}) para cada linha não vazia. ValueError se o arquivo for inválido."""
+    raw = _read_xlsx(content) if (filename or "").lower().endswith(".xlsx") else _read_csv(content)
+    if not raw:
+        raise ValueError("Arquivo vazio.")
+
+    header = [COLUMNS.get(_cell(h).lower()) for h in raw[0]]
+    missing = {"name", "cpf", "email"} - set(header)
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(sorted(missing))}")
+
+    rows = []
+    for n, values in enumerate(raw[1:], start=2):
+        if not any(_cell(v) for v in values):
+            continue
+        rows.append((n, {f: v for f, v in zip(header, values) if f}))
+    return rows
+
+
+def validate_rows(
+    rows: list[tuple[int, dict]],
+    existing_emails: set[str],
+    existing_cpfs: set[str],
+    group_ids_by_name: dict[str, int],
+    group_ids: set[int],
+) -> tuple[list[tuple[int, UserCreate]], list[dict]]:
+    """
+    Valida sem tocar no banco. Retorna (válidos, relatório por linha das rejeitadas).
+    Grupo: pelo nome (sem caixa); só se nenhum grupo tiver esse nome, pelo id numérico.
+    """
+    valid: list[tuple[int, UserCreate]] = []
+    report: list[dict] = []
+    seen_emails: set[str] = set()
+    seen_cpfs: set[str] = set()
+
+    for n, r in rows:
+        email = _cell(r.get("email")).lower()
+        cpf = _cell(r.get("cpf"))
+        try:
+            row_groups = []
+            for g in filter(None, (x.strip() for x in _cell(r.get("groups")).replace(",", ";").split(";"))):
+                gid = group_ids_by_name.get(g.lower())
+                if gid is None and g.isdigit() and int(g) in group_ids:
+                    gid = int(g)
+                if gid is None:
+                    raise ValueError(f"grupo inexistente: {g}")
+                row_groups.append(str(gid))
+            user_in = UserCreate(
+                name=_cell(r.get("name")),
+                cpf=cpf,
+                email=email,
+                phone=_cell(r.get("phone")) or None,
+                status=_cell(r.get("status")).lower() or "pending",
+                valid_from=_parse_date(r.get("valid_from")),
+                valid_to=_parse_date(r.get("valid_to")),
+                group_ids=row_groups,
+            )
+            if not user_in.name.strip() or not user_in.cpf:
+                raise ValueError("nome e CPF são obrigatórios")
+            if user_in.valid_from and user_in.valid_to and user_in.valid_to < user_in.valid_from:
+                raise ValueError("data final anterior à inicial")
+        except ValidationError as e:
+            err = e.errors()[0]
+            report.append({"row": n, "email": email, "status": "error",
+                           "detail": f"{'.'.join(map(str, err['loc']))}: {err['msg']}"})
+            continue
+        except ValueError as e:
+            report.append({"row": n, "email": email, "status": "error", "detail": str(e)})
+            continue
+
+        if email in existing_emails or email in seen_emails:
+            detail = "E-mail já foi cadastrado." if email in existing_emails else "E-mail repetido na planilha."
+            report.append({"row": n, "email": email, "status": "skipped", "detail": detail})
+            continue
+        if cpf in existing_cpfs or cpf in seen_cpfs:
+            detail = "CPF já foi cadastrado." if cpf in existing_cpfs else "CPF repetido na planilha."
+            report.append({"row": n, "email": email, "status": "skipped", "detail": detail})
+            continue
+
+        seen_emails.add(email)
+        seen_cpfs.add(cpf)
+        valid.append((n, user_in))
+
+    return valid, report
+
+
+def invite_payload(user_in: UserCreate) -> dict:
+    # datas já são date -> serialize para iso
+    return {
+        "name": user_in.name.strip(),
+        "cpf": user_in.cpf.strip(),
+        "email": user_in.email.strip().lower(),
+        "phone": (user_in.phone or "").strip() or None,
+        "status": user_in.status,  # "approved" | "pending"
+        "valid_from": user_in.valid_from.isoformat() if user_in.valid_from else None,  # isoformat transforma data em (YYYY-MM-DD)
+        "valid_to": user_in.valid_to.isoformat() if user_in.valid_to else None,
+        "group_ids": user_in.group_ids or [],
+    }
+
+
+def invite_email(name: str, confirm_url: str) -> tuple[str, str, str]:
+    """(assunto, texto, html) do convite de acesso."""
+    subject = "Confirmação de acesso"
+    text = (
+        f"Olá, {name},\n\n"
+        "Um administrador criou um acesso para você.\n"
+        "Clique no link abaixo para confirmar e ativar seu usuário:\n\n"
+        f"{confirm_url}\n\n"
+        "Se você não solicitou, ignore este e-mail."
+    )
+    html = f"""
+    <p>Olá, <strong>{name}</strong>,</p>
+    <p>Um administrador criou um acesso para você.</p>
+    <p>Clique para confirmar e ativar seu usuário:</p>
+    <p><a href="{confirm_url}">Confirmar meu acesso</a></p>
+    <p>Se você não solicitou, ignore este e-mail.</p>
+    """
+    return subject, text, html
@@ -1,6 +1,7 @@
 from datetime import date
 from sqlalchemy.orm import Session
 from models.models_rbac import User, UserStatus
+from services.principal import invalidate_principal
 
 def enforce_validity_window(db: Session, user: User) -> None:
     today = date.today()
@@ -18,3 +19,4 @@ def enforce_validity_window(db: Session, user: User) -> None:
         db.add(user)
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
@@ -0,0 +1,68 @@
+// Scroll infinito dos cards de relatórios (index.html / painel-grupo.html).
+// A 1ª página vem renderizada pelo servidor; as próximas vêm de /api/catalog/reports
+// usando o cursor em data-next do #catalog-sentinel.
+(function () {
+  const sentinel = document.getElementById("catalog-sentinel");
+  if (!sentinel || !sentinel.dataset.next) return;
+
+  const fallbackThumb = sentinel.dataset.thumb;
+  const groupId = sentinel.dataset.group || "";
+  let next = sentinel.dataset.next;
+  let loading = false;
+
+  const esc = (s) => String(s ?? "").replace(/[&<>"']/g, (c) => ({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+  }[c]));
+
+  function card(r) {
+    const privacyClass = r.is_public ? "text-success" : "text-warning";
+    return `
+      <div class="col-md-6 col-xl-4 grid-margin stretch-card">
+        <div class="card h-100">
+          <div class="card-body">
+            <h4 class="card-title">${esc(r.name)}</h4>
+            <a href="/report/${encodeURIComponent(r.id)}">
+              <div class="report-thumb-wrapper">
+                <img src="${esc(r.image_url || fallbackThumb)}" alt="${esc(r.name)}" class="report-thumb" loading="lazy">
+              </div>
+            </a>
+            <div class="d-flex py-4">
+              <div class="flex-grow">
+                <div class="d-flex d-md-block d-xl-flex justify-content-between">
+                  <h6 class="preview-subject">Este Painel Monitora</h6>
+                  <p class="text-small ${privacyClass}">${r.is_public ? "Público" : "Privado"}</p>
+                </div>
+                <p class="text-muted">${esc(r.summary || "Sem descrição")}</p>
+              </div>
+            </div>
+          </div>
+        </div>
+      </div>`;
+  }
+
+  async function loadMore() {
+    if (loading || !next) return;
+    loading = true;
+    try {
+      const params = new URLSearchParams({ cursor: next });
+      if (groupId) params.set("group_id", groupId);
+      const resp = await fetch(`/api/catalog/reports?${params}`, { credentials: "same-origin" });
+      if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+      const page = await resp.json();
+      sentinel.insertAdjacentHTML("beforebegin", page.items.map(card).join(""));
+      next = page.next_cursor;
+      if (!next) observer.disconnect();
+      // sentinela ainda visível (tela alta): o observer não dispara de novo sozinho
+      else if (sentinel.getBoundingClientRect().top < window.innerHeight + 600) setTimeout(loadMore);
+    } catch (e) {
+      console.error("Falha ao carregar mais painéis:", e);
+    } finally {
+      loading = false;
+    }
+  }
+
+  const observer = new IntersectionObserver((entries) => {
+    if (entries.some((e) => e.isIntersecting)) loadMore();
+  }, { rootMargin: "600px 0px" });
+  observer.observe(sentinel);
+})();
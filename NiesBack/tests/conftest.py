@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+_TMP = Path(tempfile.mkdtemp(prefix="niesback-tests-"))
+
+# a app importa a partir de NiesBack/ (ex.: `from core.settings import settings`)
+# e monta static/ e templates/ por caminho relativo
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+# mínimo p/ core.settings carregar sem .env; sqlite em arquivo (engines sync e async no mesmo banco)
+os.environ.setdefault("AZURE_TENANT_ID", "test")
+os.environ.setdefault("AZURE_CLIENT_ID", "test")
+os.environ.setdefault("AZURE_CLIENT_SECRET", "test")
+os.environ.setdefault("DB_URL", f"sqlite:///{_TMP / 'test.db'}")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("MEDIA_DIR", str(_TMP / "media"))
+
+
+def _fake_powerbi(request: httpx.Request) -> httpx.Response:
+    # Azure AD + Power BI REST: token de app, GET do relatório e GenerateToken
+    if "oauth2" in str(request.url):
+        return httpx.Response(200, json={"access_token": "app-token", "expires_in": 3600})
+    if request.url.path.endswith("GenerateToken"):
+        return httpx.Response(200, json={"token": "embed-token", "expiration": "2099-01-01T00:00:00Z"})
+    if request.method == "GET":
+        return httpx.Response(200, json={"embedUrl": f"https://embed{request.url.path}", "datasetId": "ds"})
+    return httpx.Response(404)
+
+
+@pytest.fixture
+def seed():
+    """
+    Banco novo com:
+    - grupos g > h; r1 (g, público), r3 (h, link externo, público), r4 (h, restrito);
+    - usuário `user` no UserGroup com permissão em r4; `admin`.
+    """
+    from db import SessionLocal, engine
+    from models.models import Base, Group, GroupClosure, Report
+    from models.models_rbac import GroupReportPermission, User, UserGroup, UserGroupMember, UserStatus
+    from services import catalog
+    from services.authz import invalidate_authz
+    from services.principal import invalidate_principal
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all([Group(id="g", name="G"), Group(id="h", name="H", parent_id="g")])
+        db.add_all([
+            GroupClosure(ancestor_id="g", descendant_id="g", depth=0),
+            GroupClosure(ancestor_id="h", descendant_id="h", depth=0),
+            GroupClosure(ancestor_id="g", descendant_id="h", depth=1),
+        ])
+        db.add_all([
+            Report(id="r1", group_id="g", name="R1", workspace_id="w1", report_id="p1", is_public=True),
+            Report(id="r3", group_id="h", name="R3", powerbi_url="https://app.powerbi.com/x", is_public=True),
+            Report(id="r4", group_id="h", name="R4", workspace_id="w1", report_id="p4", is_public=False),
+        ])
+        ug = UserGroup(name="UG")
+        user = User(name="U", cpf="1", email="u@x.com", password_hash="x", status=UserStatus.approved)
+        admin = User(name="A", cpf="2", email="a@x.com", password_hash="x", status=UserStatus.approved, is_admin=True)
+        db.add_all([ug, user, admin])
+        db.flush()
+        db.add_all([
+            UserGroupMember(user_id=user.id, group_id=ug.id),
+            GroupReportPermission(group_id=ug.id, report_id="r4"),
+        ])
+        db.commit()
+        ids = {"user": user.id, "admin": admin.id, "user_group": ug.id}
+
+    # caches por worker começam vazios em cada teste
+    invalidate_authz()
+    invalidate_principal()
+    catalog._state.update(snapshot=None, expires=0.0)
+    return ids
+
+
+@pytest.fixture
+def client(seed):
+    import main
+    from core import http
+
+    http._client = httpx.AsyncClient(transport=httpx.MockTransport(_fake_powerbi))
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def login(client):
+    """login(user_id, is_admin=False): cookie de access token como o /auth/login emitiria."""
+    from services.security import create_access_token
+
+    def _login(user_id: int, is_admin: bool = False) -> None:
+        client.cookies.set("access_token", create_access_token(str(user_id), is_admin, timedelta(minutes=5), ver=0))
+
+    return _login
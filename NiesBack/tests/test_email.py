@@ -0,0 +1,37 @@
+import smtplib
+
+import pytest
+
+from core import email
+from core.settings import settings
+
+
+class _FakeSMTP:
+    instances: list = []
+
+    def __init__(self, host, port, timeout=None):
+        self.closed = False
+        _FakeSMTP.instances.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, user, password):
+        raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_login_closes_the_socket(monkeypatch):
+    monkeypatch.setattr(smtplib, "SMTP", _FakeSMTP)
+    monkeypatch.setattr(settings, "MAIL_USE_SSL", False)
+    monkeypatch.setattr(settings, "MAIL_USERNAME", "nies")
+    monkeypatch.setattr(settings, "MAIL_PASSWORD", "errada")
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        email._smtp_connection()
+    assert _FakeSMTP.instances[-1].closed
@@ -0,0 +1,41 @@
+from sqlalchemy import delete
+
+from core.tokens import make_embed_renewal_handle
+from db import SessionLocal
+from models.models_rbac import GroupReportPermission
+from services.authz import invalidate_authz
+
+
+def _handle(rep_id: str, report_id: str) -> str:
+    return make_embed_renewal_handle({
+        "rep": rep_id, "ws": "w1", "rid": report_id, "ds": "ds",
+        "url": f"https://embed/{report_id}", "u": None, "r": [],
+    })
+
+
+def test_renewal_rechecks_permission(client, login, seed):
+    handle = _handle("r4", "p4")
+
+    # anônimo não renova relatório restrito, mesmo com handle válido
+    assert client.post("/api/powerbi/embed-token", json={"handle": handle}).status_code == 403
+
+    login(seed["user"])
+    resp = client.post("/api/powerbi/embed-token", json={"handle": handle})
+    assert resp.status_code == 200
+    assert resp.json()["accessToken"] == "embed-token"
+
+    # permissão retirada: o mesmo handle deixa de renovar
+    with SessionLocal() as db:
+        db.execute(delete(GroupReportPermission).where(GroupReportPermission.report_id == "r4"))
+        db.commit()
+    invalidate_authz()
+    assert client.post("/api/powerbi/embed-token", json={"handle": handle}).status_code == 403
+
+
+def test_renewal_of_public_report_needs_no_login(client):
+    resp = client.post("/api/powerbi/embed-token", json={"handle": _handle("r1", "p1")})
+    assert resp.status_code == 200
+
+
+def test_invalid_handle_is_401(client):
+    assert client.post("/api/powerbi/embed-token", json={"handle": "x.y.z"}).status_code == 401
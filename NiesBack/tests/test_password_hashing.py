@@ -0,0 +1,23 @@
+import asyncio
+
+from passlib.context import CryptContext
+
+from core.settings import settings
+from services import password_hashing
+
+
+def _hash_with(rounds: int) -> str:
+    return CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash("s3nha-forte")
+
+
+def test_rehash_only_raises_the_cost(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ROUNDS", 5)
+    assert password_hashing._calibrate() == 5
+
+    # custo maior que o calibrado: vale e não é regravado (não rebaixa)
+    ok, new_hash = asyncio.run(password_hashing.verify_and_update_async("s3nha-forte", _hash_with(7)))
+    assert ok and new_hash is None
+
+    # custo menor: vale e volta com hash no custo calibrado
+    ok, new_hash = asyncio.run(password_hashing.verify_and_update_async("s3nha-forte", _hash_with(4)))
+    assert ok and new_hash.startswith("$2b$05$")
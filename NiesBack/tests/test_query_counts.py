@@ -0,0 +1,37 @@
+import pytest
+
+from core.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def query_count_header(monkeypatch):
+    monkeypatch.setattr(settings, "DB_QUERY_COUNT_HEADER", True)
+
+
+def _warm_count(client, path: str) -> int:
+    # 1º request carrega índice de autorização, catálogo e Principal; conta o 2º
+    assert client.get(path).status_code == 200, path
+    resp = client.get(path)
+    assert resp.status_code == 200, path
+    return int(resp.headers["X-DB-Queries"])
+
+
+@pytest.mark.parametrize("path", ["/", "/grupo/g", "/grupo/h", "/report/r1"])
+def test_anonymous_pages_run_one_query(client, path):
+    assert _warm_count(client, path) == 1
+
+
+@pytest.mark.parametrize("path", ["/", "/grupo/g", "/grupo/h", "/report/r4"])
+def test_user_pages_run_one_query(client, login, seed, path):
+    login(seed["user"])
+    assert _warm_count(client, path) == 1
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/", 2),  # + contagem de usuários pendentes
+    ("/grupo/g", 1),
+    ("/report/r4", 1),
+])
+def test_admin_pages_query_count(client, login, seed, path, expected):
+    login(seed["admin"], is_admin=True)
+    assert _warm_count(client, path) == expected
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services import rate_limit
+from services.rate_limit import InMemoryRedis, SharedBackend, SlidingWindowLimiter
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    # meio de uma janela de 60s: nada de virada de janela durante o teste
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 6030.0)
+
+
+def test_in_memory_pipeline_is_atomic():
+    client = InMemoryRedis()
+
+    async def run():
+        pipe = client.pipeline(transaction=True)
+        pipe.get("a").incr("b").expire("b", 60)
+        return await pipe.execute()
+
+    assert asyncio.run(run()) == [None, 1, True]
+    assert asyncio.run(client.get("b")) == 1
+
+
+def test_in_memory_expire_and_decr():
+    client = InMemoryRedis()
+
+    async def run():
+        await client.incr("k")
+        await client.expire("k", 0)
+        expired = await client.get("k")
+        await client.incr("k")
+        await client.decr("k")
+        return expired, await client.get("k")
+
+    assert asyncio.run(run()) == (None, 0)
+
+
+def test_shared_limit_holds_across_workers(frozen_time):
+    client = InMemoryRedis()
+    # dois "workers", cada um com seu limiter, dividindo o mesmo Redis
+    workers = [SlidingWindowLimiter(SharedBackend(client), limit=5, window=60) for _ in range(2)]
+
+    async def run():
+        return await asyncio.gather(*(workers[i % 2].hit("login:email:a@x") for i in range(40)))
+
+    results = asyncio.run(run())
+    assert sum(r is None for r in results) == 5
+    assert all(r > 0 for r in results if r is not None)
+    # rejeitadas são descontadas: o contador fica no limite
+    assert asyncio.run(client.get("rl:login:email:a@x:100")) == 5
+
+
+def test_email_rejection_does_not_spend_ip_budget(frozen_time, monkeypatch):
+    client = InMemoryRedis()
+    monkeypatch.setattr(rate_limit, "login_by_ip", SlidingWindowLimiter(SharedBackend(client), limit=3, window=60))
+    monkeypatch.setattr(rate_limit, "login_by_email", SlidingWindowLimiter(SharedBackend(client), limit=2, window=60))
+
+    async def attempt(email: str) -> int:
+        try:
+            await rate_limit.check_login_rate(email, "10.1.1.1")
+        except HTTPException as e:
+            return e.status_code
+        return 200
+
+    async def run():
+        return [await attempt("a@x") for _ in range(5)] + [await attempt("b@x")]
+
+    assert asyncio.run(run()) == [200, 200, 429, 429, 429, 200]
+    assert asyncio.run(client.get("rl:login:ip:10.1.1.1:100")) == 3
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from db import SessionLocal, async_engine
+from models.models_rbac import User
+from services import token_revocation
+from services.token_revocation import current_version, revoke_user_tokens, sync_revocations
+
+
+@pytest.fixture(autouse=True)
+def empty_versions(monkeypatch):
+    monkeypatch.setattr(token_revocation, "_versions", {})
+
+
+def _sync() -> None:
+    async def run():
+        try:
+            await sync_revocations()
+        finally:
+            await async_engine.dispose()  # conexões do aiosqlite presas a este loop
+    asyncio.run(run())
+
+
+def test_revocation_is_published_only_after_commit(seed):
+    uid = seed["user"]
+    with SessionLocal() as db:
+        revoke_user_tokens(db, db.get(User, uid))
+        db.flush()
+        assert current_version(uid) == 0  # ainda não commitado
+        db.rollback()
+    assert current_version(uid) == 0
+
+    with SessionLocal() as db:
+        revoke_user_tokens(db, db.get(User, uid))
+        db.commit()
+    assert current_version(uid) == 1
+
+
+def test_sync_keeps_newer_local_versions(seed):
+    uid, admin_id = seed["user"], seed["admin"]
+    with SessionLocal() as db:
+        db.get(User, admin_id).token_version = 2
+        db.get(User, uid).token_version = 1
+        db.commit()
+
+    # revogação local mais nova que o que a sync leu do banco
+    token_revocation._versions[uid] = 3
+    _sync()
+    assert current_version(uid) == 3
+    assert current_version(admin_id) == 2